@@ -1,163 +1,64 @@
 # 🌐 Streamlit and UI
 import streamlit as st
-import time
-import re
-from streamlit_javascript import st_javascript
+from device import detect_device
 
 # 📅 Date and Time
 from datetime import date
 import calendar    
 
 # 📄 PDF Handling (pdfrw)
-from pdfrw import (
-    PdfReader, PdfWriter, PdfDict, PdfName,
-    PdfString, PdfArray, PdfObject
-)
-from pdfrw.buildxobj import pagexobj
-from pdfrw.toreportlab import makerl
-
-# 🖋️ PDF Drawing (ReportLab)
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-
-# 🧠 In-memory stream for overlay
-from io import BytesIO
-
-# 🌐 External Resources
-import urllib.request
-
-# 🗂️ File System
-import os  # ✅ Needed for checking file existence
-
-
-
-# ✅ Download font from GitHub if not already present
-font_url = "https://raw.githubusercontent.com/ediesonmalabag-source/chat/main/DejaVuSans.ttf"
-font_path = "DejaVuSans.ttf"
-
-try:
-    if not os.path.exists(font_path):
-        urllib.request.urlretrieve(font_url, font_path)
-    pdfmetrics.registerFont(TTFont("DejaVuSans", font_path))
-except Exception as e:
-    st.error(f"Font loading failed: {e}")
-
-# ---------------------------------------
-# 🔧 PDF FILLING FUNCTION (top of file)
-# ---------------------------------------
-
-def fill_pdf(input_pdf_path, output_pdf_path, data_dict):
-    try:
-        template_pdf = PdfReader(input_pdf_path)
-        # ✅ Force checkbox appearance rendering
-        from pdfrw import PdfObject
-        template_pdf.Root.AcroForm.update(PdfDict(NeedAppearances=PdfObject("true")))
-        
-        for page_index, page in enumerate(template_pdf.pages):
-            # Create overlay canvas for this page
-            packet = BytesIO()
-            can = canvas.Canvas(packet, pagesize=letter)
-
-            annots = page.get(PdfName("Annots"))
-            
-            # ✅ MAPPING gender, status, employment    
-            sex_map = {
-                "Male": "sex_male",
-                "Female": "sex_female"
-            }
-            civil_map = {
-                "Single": "civilstatus_single",
-                "Married": "civilstatus_married",
-                "Divorced": "civilstatus_divorce",
-                "Widowed": "civilstatus_widow",
-                "Live-in": "civilstatus_livein"
-            }
-            employment_status_map = {
-                "Unemployed": "empstatus_unemp",
-                "Wage Employed": "empstatus_wage",
-                "Underemployed": "empstatus_under",
-                "Self-Employed": "empstatus_self"
-            }
-            employment_type_map = {
-                "None": "emptype_none",
-                "Casual": "emptype_casual",
-                "Probationary": "emptype_probationary",
-                "Contractual": "emptype_contractual",
-                "Regular": "emptype_regular",
-                "Job Order": "emptype_joborder",
-                "Permanent": "emptype_permanent",
-                "Temporary": "emptype_temporary"
-            }
-            
-            if annots:
-                for a in annots:
-                    if a.get(PdfName("Subtype")) == PdfName("Widget"):
-                        t = a.get(PdfName("T"))
-                        rect = a.get(PdfName("Rect"))
-                    if t and rect:
-                        key = t.to_unicode().strip("()") if hasattr(t, "to_unicode") else t[1:-1]
-
-                         # ✅ Gender checkbox Mark X
-                        if key == sex_map.get(data_dict.get("Sex")):
-                            x, y = float(rect[0]), float(rect[1])
-                            can.setFont("DejaVuSans", 12)
-                            can.drawString(x + 1, y + 1, "X")
-                        
-                        # ✅ Civil Status checkbox Mark X
-                        if key == civil_map.get(data_dict.get("CivilStatus")):
-                            x, y = float(rect[0]), float(rect[1])
-                            can.setFont("DejaVuSans", 12)
-                            can.drawString(x + 1, y + 1, "X")
-                        
-                        # ✅ Employment Status checkbox Mark X
-                        if key == employment_status_map.get(data_dict.get("EmploymentStatus")):
-                            x, y = float(rect[0]), float(rect[1])
-                            can.setFont("DejaVuSans", 12)
-                            can.drawString(x + 1, y + 1, "X")
-                            
-                        # ✅ Employment Type checkbox Mark X
-                        if key == employment_type_map.get(data_dict.get("EmploymentType")):
-                            x, y = float(rect[0]), float(rect[1])
-                            can.setFont("DejaVuSans", 12)
-                            can.drawString(x + 1, y + 1, "X")
-
-                        # ✅ Draw regular text fields (skip gender boxes)
-                        elif key in data_dict:
-                            x, y = float(rect[0]), float(rect[1])
-                            can.setFont("DejaVuSans", 10)
-                            can.drawString(x + 2, y + 2, str(data_dict[key]))
-            
-           
-
-            can.save()
-            packet.seek(0)
-
-            # Read overlay and merge with current page
-            overlay_pdf = PdfReader(packet)
-            if overlay_pdf.pages:
-                overlay_page = overlay_pdf.pages[0]
-                if overlay_page.Contents:
-                    from pdfrw import PdfArray
-                    if page.Contents:
-                        page.Contents = PdfArray([page.Contents, overlay_page.Contents])
-                    else:
-                        page.Contents = overlay_page.Contents
-
-            
-
-        PdfWriter().write(output_pdf_path, template_pdf)
-        return True, None
+from pdf_fill import registration_filename, TEMPLATE_PATH  # ✅ Cached template + overlay filling
+import pdf_jobs  # 🏭 Renders run on a bounded worker pool
+import time
+from functools import wraps
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# 🤖 Chatbot replies and response catalog
+from chatbot import respond, user_message, bot_message
+from chat_ui import render_history, reset_history
+
+# 🚀 One-time resource warm-up (fonts, PDF template, response catalog)
+from resources import bootstrap
+import metrics  # 📈 Stage timings + counters (Prometheus text)
+import session_memory  # 🧠 Per-session bytes + idle eviction
+from assets import image_html
+
+# ✅ Runs once per server process; later reruns return the cached status immediately
+resource_status = bootstrap()
+run_started = time.perf_counter()  # full-script run time, observed at the bottom
+
+
+timed_scopes = []  # fragment rerun being timed right now (nested fragments count under it)
+
+
+def timed_fragment(scope, **fragment_kwargs):
+    # ✅ st.fragment whose own reruns are timed as app_run_seconds{scope};
+    #    when it runs as part of a full run it is counted under scope="app"
+    def decorate(fn):
+        @wraps(fn)
+        def run(*args, **kwargs):
+            ctx = get_script_run_ctx()
+            if ctx is None or not ctx.fragment_ids_this_run or timed_scopes:
+                return fn(*args, **kwargs)
+            session_memory.touch()  # ✅ fragment-only reruns count as activity too
+            timed_scopes.append(scope)
+            try:
+                with metrics.timer("app_run_seconds", scope=scope):
+                    return fn(*args, **kwargs)
+            finally:
+                timed_scopes.pop()
+        return st.fragment(run, **fragment_kwargs)
+    return decorate
 
-    except Exception as e:
-        return False, f"Failed to generate visible PDF: {e}"
-        
 # --------------------------
 # Page config (must be first)
 # --------------------------
 st.set_page_config(page_title="Simple Chatbot", page_icon="🤖", layout="wide")
 
+# ✅ Surface resource warm-up failures (reported once per process by bootstrap)
+if resource_status.get("fonts", {}).get("state") == "failed":
+    st.error(f"Font loading failed: {resource_status['fonts'].get('error')}")
+
 st.markdown("""
 <style>
 html {
@@ -179,8 +80,8 @@ if st.query_params.get("form") == "1" and st.session_state.get("show_enrolment_f
 # --------------------------
 st.markdown("""
 <style>
-/* remove bottom margin below Streamlit image and header spacing */
-img[alt="image"] { display:block; margin-bottom: 0 !important; }
+/* remove bottom margin below the banner/guide <picture> (assets.image_html) and header spacing */
+picture img { display:block; margin-bottom: 0 !important; }
 h3 { margin-top: 0 !important; margin-bottom: 0 !important; }
 </style>
 """, unsafe_allow_html=True)
@@ -194,9 +95,15 @@ if "welcome_sent" not in st.session_state:
     st.session_state.welcome_sent = False
 if "last_action" not in st.session_state:
     st.session_state.last_action = None
+
+# ✅ Mark the session active (and give it its session_key, the per-session PDF job limit);
+#    idle sessions' history is trimmed by the sweeper
+session_memory.start_sweeper()
+session_memory.touch()
     
-# DETECT MOBILE MESSENGER BROWSER 
-screen_width = st_javascript("window.innerWidth") or 768
+# DETECT MOBILE MESSENGER BROWSER (once per session, see device.py)
+device = detect_device()
+screen_width = device["width"]
 
 if "show_mobile_warning" not in st.session_state:
     st.session_state.show_mobile_warning = False
@@ -363,17 +270,15 @@ st.markdown("""
 #  </div>
 # """, unsafe_allow_html=True)
 
-st.image("https://raw.githubusercontent.com/ediesonmalabag-source/chat/main/bit_banner.png", use_container_width=True)
+# ✅ Local resized WebP/JPEG variant (see assets.py), picked by screen width
+st.markdown(image_html("bit_banner", screen_width, alt="TESDA BIT banner"), unsafe_allow_html=True)
 
 # Add welcome message only once (immediately after banner)
 if "welcome_sent" not in st.session_state:
     st.session_state.welcome_sent = False
 
 if not st.session_state.welcome_sent:
-    st.session_state.messages.append((
-        "Bot",
-        "👋 Hi there! I'm the TESDA BIT Chatbot. Whether you're on mobile or desktop, I can help you with qualifications, enrolment, assessment, or reaching TESDA BIT. Tap a button or send a message to get started."
-    ))
+    st.session_state.messages.append(bot_message("welcome"))
     st.session_state.welcome_sent = True
     
 # ----------------------------
@@ -386,66 +291,6 @@ if "show_enrolment_form" not in st.session_state:
     st.session_state.show_enrolment_form = "idle"
 
 
-# ------------------------------------
-# DEFINING QUALIFICATION RESPONSES
-# -------------------------------------
-cookery_response = """<h4 style='color:#003366; font-weight:bold;'>🍳Cookery NC II</h4>
-        ⏱️ <b>Nominal Duration:</b> 316 hours (40 days)<br><br>
-        <h5 style='color:#003366;'>📚 Qualification Description:</h5>
-        This qualification consists of competencies that a person must achieve to clean kitchen areas, prepare hot, cold meals 
-        and desserts for guests in various food and beverage service facilities.<br><br>
-        <h5 style='color:#003366;'>🧰 Cluster of Core Units of Competencies:</h5>
-        • Prepare and Cook Hot Meals<br>
-        • Prepare Cold Meals<br>
-        • Prepare Sweets<br><br>
-        <h5 style='color:#003366;'>📌 Entry Requirements:</h5>
-        • Can communicate both in oral and written<br> 
-        • Physically and mentally fit<br> 
-        • With good moral character<br> 
-        • Can perform basic mathematical computation<br><br>
-       <h5 style='color:#003366;'>📊 Assessment Information:</h5>
-       • Held at the TESDA-BIT Assessment Center<br>
-       • Covers hands-on cooking tasks, food safety, portioning, plating techniques, and kitchen sanitation based on TESDA standards.<br>
-       • <b>Assessment fee: ₱978</b> — <b>Free for TESDA scholars</b> (just present your scholarship ID or enrolment proof)<br>
-       • <a href='https://drive.google.com/file/d/1Z5vTvtxIRkiLTrGQPfy7g064scP7X_DG/view?usp=sharing' target='_blank'>📥 Download Self-Assessment Guide (PDF)</a> or request a printed copy<br><br>
-       <h5 style='color:#003366;'>Eligibility:</h5>
-       • Trainees who have successfully completed Cookery NC II training<br>
-       • Industry workers with relevant experience and a valid Certificate of Employment<br><br>
-       <h5 style='color:#003366;'>Certification:</h5> 
-       Passers receive a TESDA National Certificate (NC II), valid for 5 years and recognized both nationwide and internationally.<br><br>
-       <h5 style='color:#003366;'>🏨 Career Opportunities:</h5>
-        • Cook or Commis - in hotels, restaurants or catering services<br>
-        • Assistant Cook - in institutional or commercial kitchens<br><br>
-        📝 <i>Want to enrol?</i> Tap the <b>Enrolment</b> button below<br>
-        📊 <i>Ready for assessment?</i> Tap the <b>Assessment</b> button below<br>
-        📞 <i>Need help or have questions?</i> Tap the <b>Contact</b> button below<br>
-        🎓 <i>Want to explore other courses?</i> Type <b>css</b>, <b>baking</b> or <b>welding</b> to view more qualifications
-        """
-
-css_response = """<h4 style='color:#003366; font-weight:bold;'>💻Computer Systems Servicing NC II</h4>
-... (your full HTML block here)
-"""
-
-bread_pastry_response = """<h4 style='color:#003366; font-weight:bold;'>🧁Bread and Pastry Production NC II</h4>
-... (your full HTML block here)
-"""
-# ------------------------------------
-# CREATE KEYWORD RESPONSE DICTIONARY
-# -------------------------------------
-
-qualification_responses = {
-    "cookery nc ii": cookery_response,
-    "cookery": cookery_response,
-    "cook": cookery_response,
-    "computer": css_response,
-    "css": css_response,
-    "computer servicing": css_response,
-    "bread": bread_pastry_response,
-    "pastry": bread_pastry_response,
-    "baking": bread_pastry_response,
-    "bread and pastry": bread_pastry_response,
-}
-
 # --------------------------
 # Sidebar Info + Reset
 # --------------------------
@@ -460,7 +305,7 @@ with st.sidebar:
     """)
     # Reset button
     if st.button("🔄 Reset Chat"):
-        st.session_state.messages = []
+        reset_history()
         st.session_state.welcome_sent = False
         st.session_state.last_action = None
         st.session_state.show_enrolment_form = "idle"
@@ -468,158 +313,46 @@ with st.sidebar:
         
         
 # --------------------------
-# Chatbot response function
-# --------------------------
-def chatbot_response(user_message: str) -> str:
-    user_message = user_message.lower().strip()
-    user_message = re.sub(r'[^\w\s]', '', user_message)
-    matched = False
-    response_html = ""
-
-    # Match specific qualifications first (these already contain HTML)
-    for keyword, response in qualification_responses.items():
-        if keyword in user_message:
-            return response
-            
-# 👋 Greetings
-    if user_message in ["hi", "hello", "hey", "haha"]:
-        matched = True
-        response_html = "👋 Hi! I'm the TESDA BIT Chatbot. Ask about qualifications, enrolment, assessment, or contact us—just tap a button or type below."
-   
-    # ------------
-    # ENROLMENT
-    # ------------
-    elif any(kw in user_message for kw in ["enrollment", "enrolment", "enroll", "enrol", "enroling", "enrolling"]):
-        matched = True
-        response_html = """<h4 style='color:#003366; font-weight:bold;'>📋 TESDA Enrolment Form</h4>
-        You can now fill out your TESDA registration form directly inside this app.<br><br>
-        👉 <a href='?form=1' target='_self' style='font-weight:bold; color:#2C5FA0;'>Click here to fill up the form</a>
-        Once submitted, you'll be able to download your completed PDF instantly.<br><br>
-        ✅ <i>No need to print or scan — it's all digital.</i>
-        """
-       
-
-    # ------------
-    # CONTACT
-    # -------------
-
-    elif any(kw in user_message.lower() for kw in ["contact", "help", "assist", "support", "reach out", "call", "email"]):
-        match =True
-        response_html = """<h4 style='color:#003366; font-weight:bold;'>📞 TESDA-BIT Contact Information</h4>
-        🌐 <b>Facebook Page:</b> <a href='https://www.facebook.com/profile.php?id=61561653118631' target='_blank' style='color:#003366; font-weight:italic;'>Bangui Institute of Technology TESDA</a><br>
-        💬 <b>Messenger Chat:</b> <a href='https://m.me/bit.tesda' target='_blank'>Send a message via Messenger</a><br>
-        📱 <b>Cellphone No.:</b> <a href="tel:09088600955" style="color:#003366; font-weight:italic;">0908-860-0955</a><br>
-        📧 <b>Email:</b> <a href='mailto:bit@tesda.gov.ph'>bit@tesda.gov.ph</a><br>
-        📍 <b>Office Address:</b> TESDA-Bangui Institute of Technology, Brgy. Manayon, Bangui, Ilocos Norte<br><br>
-        🕒 <b>Office Hours:</b> Monday to Friday, 8:00 AM – 5:00 PM<br>
-        📅 <b>Walk-in Inquiries:</b> No appointment needed during office hours<br><br>
-        ✅ <i>For enrolment assistance, document submission, or qualification inquiries, feel free to reach out anytime.</i>
-        """
- # ------------
- # QUALIFICATION
- # -------------
-    elif any(kw in user_message.lower() for kw in ["qualification", "course", "program", "training", "offered", "available courses"]):
-        match = True
-        response_html = """<h4 style='color:#003366; font-weight:bold;'>🎓 TESDA-BIT Qualifications Offered</h4>
-        <h5 style='color:#003366;'>🧰 National Certificate Programs:</h5>
-        •🧁<b>Bread and Pastry Production NC II</b><br>
-        •💻<b>Computer Systems Servicing NC II</b><br>
-        •🍳<b>Cookery NC II</b><br>
-        •🚗<b>Driving NC II</b><br>
-        •🍽️<b>Food and Beverage Services NC II</b><br>
-        •🏭<b>Food Processing NC II</b><br>
-        •🧹<b>Housekeeping NC II</b><br>
-        •🧱<b>Masonry NC II</b><br>
-        •🔧<b>Motorcycle Small Engine Servicing NC II</b><br>
-        •🌱<b>Organic Agriculture Production NC II</b><br>
-        •🔩<b>Shielded Metal Arc Welding (SMAW) NC I</b><br>
-        •🔩<b>Shielded Metal Arc Welding (SMAW) NC II</b><br><br>
-         <h5 style='color:#003366;'>🧑‍🏫 Trainer Qualification:</h5>
-        •🏘️<b>Community-Based Trainers Methodology Course</b><br>
-        •📋<b>Trainers Methodology Level I</b> (for aspiring trainers and assessors)<br><br>
-        <h5 style='color:#003366;'>⏱️ Training Duration:</h5>
-        • Varies per qualification<br>
-        • Includes classroom instruction, hands-on activities, and competency assessment<br><br>
-        <h5 style='color:#003366;'>📜 Certification:</h5>
-        • Trainees who pass the national assessment will receive a <b>TESDA National Certificate (NC I or NC II)</b><br>
-        • <b>Trainer’s Methodology Level I</b> passers are qualified to deliver and assess Competency-Based Training programs<br>
-        • CBTMC passers are qualified to deliver community-based trainings<br>
-        • Certificates are recognized nationwide and valued globally, especially in hospitality and technical fields.<br><br>
-        📅 <i>Note: All qualifications follow TESDA’s Competency-Based Training (CBT) format and are aligned with industry standards.</i><br><br>
-        💡 <b>Want to explore a course?</b><br>
-        Just type the name of a qualification (e.g., <i>cookery</i>, <i>css</i>, or <i>bread and pastry</i>) to view full details — including duration, core competencies, and career opportunities.<br><br>
-        📞 <b>Need help deciding?</b> Tap the <b>Contact</b> button below to reach us directly.<br>
-        📝 <b>Ready to enrol?</b> Tap the <b>Enrolment</b> button to begin your registration.
-        """
-
-    elif "assessment" in user_message:
-        match = True
-        response_html = "📊 Assessment schedules and requirements vary by qualification. Please contact TESDA BIT for details."
-
-
-    # ❓ Fallback MESSAGE, if no match found
-    if not matched and response_html == "":
-        response_html = """❓ <b>I couldn’t match your message to a specific qualification, enrolment steps, or assessment details.</b><br><br>
-        Here are a few examples of what you can ask about:<br>
-        • 🍳 Cookery NC II<br>
-        • 💻 Computer Systems Servicing NC II<br>
-        • 🧁 Bread and Pastry Production NC II<br>
-        (…and many more!)<br><br>
-        Type <b>qualification</b> to see the full list.<br><br>
-        You can also ask about:<br>
-        • 📝 Enrolment<br>
-        • 📊 Assessment<br>
-        • 📞 Contact<br><br>
-        Or just tap the buttons below!
-        """
-    return response_html
-    
-
-
-# --------------------------
-# Determine user input
-# --------------------------
-user_input = None  # ✅ Initialize first
-
-chat_in = st.chat_input("Type your message here...")
-if chat_in:
-    user_input = chat_in
-
-if st.session_state.last_action:
-    user_input = st.session_state.last_action
-    st.session_state.last_action = None
-
-# --------------------------
-# Process user input
+# Chat fragment: input + history
 # --------------------------
-if user_input:
-    st.session_state.messages.append(("You", user_input))
-    with st.spinner("Bot is typing..."):
-        time.sleep(0.9)
+# A message reruns only this function, not the page (CSS, banner, sidebar,
+# form). Inside a fragment the chat input renders inline, under the history.
+def process_input(user_input):
+    st.session_state.messages.append(user_message(user_input))
 
     try:
-        bot_reply = chatbot_response(user_input)
+        response_id, bot_reply = respond(user_input)
+        reply = bot_message(response_id)
     except Exception as e:
         bot_reply = f"⚠️ An internal error occurred while generating a reply: {e}"
+        reply = bot_message(text=bot_reply)
 
-    st.session_state.messages.append(("Bot", bot_reply))
-    st.markdown(bot_reply, unsafe_allow_html=True)
+    # ✅ History keeps only the response id; the HTML is shared process-wide
+    st.session_state.messages.append(reply)
+    return bot_reply
 
 
+@timed_fragment("chat", key="chat")
+def chat_panel():
+    history = st.container()  # ✅ filled after the input is read, drawn above it
+    user_input = st.chat_input("Type your message here...")
 
+    # ✅ Set by a bottom button (queue_action), which reruns only this fragment
+    if st.session_state.last_action:
+        user_input = st.session_state.last_action
+        st.session_state.last_action = None
 
- 
-# --------------------------
-# Display chat history
-# --------------------------
-for role, msg in st.session_state.messages:
-    if role == "You":
-        st.markdown(
-            f"<div style='background-color:#DCF8C6; padding:10px; border-radius:15px; margin:5px; text-align:right;'>"
-            f"🧑 <b>{role}:</b> {msg}</div>",
-            unsafe_allow_html=True,
-        )
-    else: st.markdown( f"<div style='background-color:#e6f2ff; padding:10px 15px; border-radius:10px; margin-top:-6px; margin-bottom:10px; color:#003366;'>" f"{msg}" f"</div>", unsafe_allow_html=True, )
+    with history:
+        summary = st.session_state.get(session_memory.SUMMARY_KEY)
+        if summary and summary["messages_dropped"]:
+            st.caption(f"🗂️ {summary['messages_dropped']} earlier messages were cleared while this chat was idle.")
+        if user_input:
+            process_input(user_input)
+        # ✅ No server-side sleep: the typing effect (if any) runs in the browser
+        render_history(st.session_state.messages, reply=bool(user_input))
+
+
+chat_panel()
 
 # --------------------------
 # Mobile tip (moved after chat history so it appears in-view on mobile)
@@ -638,11 +371,14 @@ if st.session_state.show_mobile_warning:
             unsafe_allow_html=True,
         )
 
-        image_url = "https://raw.githubusercontent.com/ediesonmalabag-source/chat/main/openinchrome.png"
+        guide_image = image_html(
+            "openinchrome", screen_width, alt="open in browser guide",
+            style="max-width:100%; width:auto; height:auto; border-radius:6px;",
+        )
         st.markdown(
             f'''
             <figure style="margin:0;">
-              <img src="{image_url}" alt="open in browser guide" style="max-width:100%; width:auto; height:auto; border-radius:6px;">
+              {guide_image}
             </figure>
             ''',
             unsafe_allow_html=True,
@@ -657,248 +393,271 @@ if st.session_state.show_mobile_warning:
             st.session_state.show_mobile_warning = False
             
 # --------------------------
-# Bottom-aligned buttons
+# Bottom-aligned buttons (fragment)
 # --------------------------
-st.markdown("<br>", unsafe_allow_html=True)
-col1, col2, col3, col4 = st.columns(4)
-with col1:
-    if st.button("🎓 Qualifications"):
-        st.session_state.last_action = "qualifications"
-with col2:
-    if st.button("📝 Enrolment"):
-        st.session_state.last_action = "enrolment"
-        
-with col3:
-    if st.button("📊 Assessment"):
-        st.session_state.last_action = "assessment"
-with col4:
-    if st.button("📞 Contact"):
-        st.session_state.last_action = "contact"
+def queue_action(action):
+    # ✅ on_click: hand the action to the chat and rerun only the chat fragment
+    st.session_state.last_action = action
+    st.rerun(scope="chat")
+
+
+@timed_fragment("buttons", key="buttons")
+def action_buttons():
+    st.markdown("<br>", unsafe_allow_html=True)
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.button("🎓 Qualifications", on_click=queue_action, args=("qualifications",))
+    with col2:
+        st.button("📝 Enrolment", on_click=queue_action, args=("enrolment",))
+    with col3:
+        st.button("📊 Assessment", on_click=queue_action, args=("assessment",))
+    with col4:
+        st.button("📞 Contact", on_click=queue_action, args=("contact",))
+
+
+action_buttons()
 
 
 #------------------------
 # FORM FILL UP BELOW INPUT CHAT BOX AND BUTTONS
 # --------------------------
-if st.session_state.get("show_enrolment_form") == "form":
-    st.markdown("<div id='fillform'></div>", unsafe_allow_html=True)
-    st.subheader("🧠 Fill the TESDA registration form")
+def show_pdf_result(state, payload, filename):
+    if state == "done":
+        # ✅ Serve the bytes for download (bytes() joins an incremental PDF's two parts, once, here)
+        st.success("✅ Your TESDA form has been filled and flattened.")
+        with metrics.timer("pdf_stage_seconds", stage="serve"):
+            st.download_button(
+                "📥 Download Your Filled Form",
+                bytes(payload),
+                file_name=filename,
+                mime="application/pdf",
+                )
+        # CANCEL BUTTON clears the form idle
+        st.session_state.show_enrolment_form = "idle"
+    elif isinstance(payload, FileNotFoundError):
+        st.error("Template PDF not found. Place tesdabit_regform.pdf in the app folder.")
+    else:
+        st.error(f"Failed to generate PDF: {payload or 'the job was lost, please try again.'}")
+
+
+@timed_fragment("pdf_poll", run_every=pdf_jobs.POLL_INTERVAL)
+def pdf_job_status():
+    job = st.session_state.get("pdf_job")
+    if not job:
+        return
+    state, payload = pdf_jobs.poll(job["id"])
+    if state == "pending":
+        st.info("⏳ Filling PDF...")
+        return
+    del st.session_state.pdf_job
+    st.session_state.pdf_result = (state, payload, job["filename"])
+    st.rerun(scope="app")  # once per slow PDF: hides the form and shows the result below it
 
-    with st.form("tesda_form"):
-        
-        # ✅ ENTRY DATE
-        col_date, _ = st.columns([1, 3])  # Adjust width ratio as needed
-        with col_date:
-            entry_date = st.date_input("Entry Date (MM/DD/YY)", value=date.today())
-
-        # ✅ PERSONAL INFORMATION
-        st.markdown("### 👤 Personal Information")
-
-        # Row 1: Last Name, First Name, Middle Name
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            last_name = st.text_input("Last Name", value="")
-        with col2:
-            first_name = st.text_input("First Name", value="")
-        with col3:
-            middle_name = st.text_input("Middle Name", value="")
-
-        # Row 2: Sex, Civil Status, Nationality
-        col4, col5, col6 = st.columns(3)
-        with col4:
-            sex = st.selectbox("Sex", ["Male", "Female"])
-        with col5:
-            civil_status = st.selectbox("Civil Status", [
-                "Single", "Married", "Divorced", "Widowed", "Live-in"
-            ])
-        with col6:
-            nationality = st.selectbox("Nationality", [
-                "Filipino", "American", "British", "Canadian", "Chinese",
-                "Japanese", "Korean", "Indian", "Australian", "Other"
-            ])
 
-        # Row 3: Birthdate (Month, Day, Year, Age)
-        st.markdown("**Birthdate**")
-        col7, col8, col9, col10 = st.columns(4)
-
-        # Month selector
-        with col7:
-            birth_month = st.selectbox("Month", [
-                "January", "February", "March", "April", "May", "June",
-                "July", "August", "September", "October", "November", "December"
-            ], key="birth_month")
-
-        # Day selector
-        with col8:
-            birth_day = st.selectbox("Day", list(range(1, 32)), key="birth_day")
-
-        # Year selector
-        with col9:
-            birth_year = st.selectbox("Year", list(range(1950, date.today().year + 1)), key="birth_year")
-
-        # Convert month name to number
-        month_number = list(calendar.month_name).index(birth_month)
-
-        # Calculate age
-        try:
-            birthdate = date(birth_year, month_number, birth_day)
-            today = date.today()
-            age = today.year - birthdate.year - ((today.month, today.day) < (birthdate.month, birthdate.day))
-            age_display = str(age)
+# --------------------------
+# Form fragment: typing in the form, Generate PDF and Cancel rerun only this
+# --------------------------
+def close_form():
+    # ✅ on_click runs before the fragment reruns, so the form is already gone
+    st.session_state.show_enrolment_form = "idle"
+
+
+@timed_fragment("form", key="form")
+def registration_form():
+    if st.session_state.get("show_enrolment_form") == "form":
+        st.markdown("<div id='fillform'></div>", unsafe_allow_html=True)
+        st.subheader("🧠 Fill the TESDA registration form")
+
+        with st.form("tesda_form"):
+        
+            # ✅ ENTRY DATE
+            col_date, _ = st.columns([1, 3])  # Adjust width ratio as needed
+            with col_date:
+                entry_date = st.date_input("Entry Date (MM/DD/YY)", value=date.today())
+
+            # ✅ PERSONAL INFORMATION
+            st.markdown("### 👤 Personal Information")
+
+            # Row 1: Last Name, First Name, Middle Name
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                last_name = st.text_input("Last Name", value="")
+            with col2:
+                first_name = st.text_input("First Name", value="")
+            with col3:
+                middle_name = st.text_input("Middle Name", value="")
+
+            # Row 2: Sex, Civil Status, Nationality
+            col4, col5, col6 = st.columns(3)
+            with col4:
+                sex = st.selectbox("Sex", ["Male", "Female"])
+            with col5:
+                civil_status = st.selectbox("Civil Status", [
+                    "Single", "Married", "Divorced", "Widowed", "Live-in"
+                ])
+            with col6:
+                nationality = st.selectbox("Nationality", [
+                    "Filipino", "American", "British", "Canadian", "Chinese",
+                    "Japanese", "Korean", "Indian", "Australian", "Other"
+                ])
+
+            # Row 3: Birthdate (Month, Day, Year, Age)
+            st.markdown("**Birthdate**")
+            col7, col8, col9, col10 = st.columns(4)
+
+            # Month selector
+            with col7:
+                birth_month = st.selectbox("Month", [
+                    "January", "February", "March", "April", "May", "June",
+                    "July", "August", "September", "October", "November", "December"
+                ], key="birth_month")
+
+            # Day selector
+            with col8:
+                birth_day = st.selectbox("Day", list(range(1, 32)), key="birth_day")
+
+            # Year selector
+            with col9:
+                birth_year = st.selectbox("Year", list(range(1950, date.today().year + 1)), key="birth_year")
+
+            # Convert month name to number
+            month_number = list(calendar.month_name).index(birth_month)
+
+            # Calculate age
+            try:
+                birthdate = date(birth_year, month_number, birth_day)
+                today = date.today()
+                age = today.year - birthdate.year - ((today.month, today.day) < (birthdate.month, birthdate.day))
+                age_display = str(age)
     
-            # FORCE update session state
-            st.session_state.age_value = age_display
+                # FORCE update session state
+                st.session_state.age_value = age_display
     
-        except ValueError as e:
-            age_display = ""
-            st.session_state.age_value = ""
+            except ValueError as e:
+                age_display = ""
+                st.session_state.age_value = ""
 
-        # Initialize if not set
-        if 'age_value' not in st.session_state:
-            st.session_state.age_value = ""
+            # Initialize if not set
+            if 'age_value' not in st.session_state:
+                st.session_state.age_value = ""
 
-        # ✅ Textbox with the calculated age FROM SESSION STATE
-        with col10:
-            age_input = st.text_input("Age", value=st.session_state.age_value, key="age_input")
+            # ✅ Textbox with the calculated age FROM SESSION STATE
+            with col10:
+                age_input = st.text_input("Age", value=st.session_state.age_value, key="age_input")
 
 
         
-    # ---------------------------------------------------
+        # ---------------------------------------------------
     
-        email = st.text_input("Email", value="")
-        contact_no = st.text_input("Contact No.", value="")
+            email = st.text_input("Email", value="")
+            contact_no = st.text_input("Contact No.", value="")
         
-         # ✅ ADDRESS INFORMATION
-        st.markdown("### 📍 Address Information")
-
-        # Row 1: Number & Street + Barangay
-        col1, col2 = st.columns(2)
-        with col1:
-            number_street = st.text_input("Number & Street", value="")
-        with col2:
-            barangay = st.text_input("Barangay", value="")
-
-       # Row 2: Municipality + Province + Congressional District + Region
-        col3, col4, col5, col6 = st.columns(4)
-        with col3:
-            municipality = st.text_input("Municipality", value="")
-        with col4:
-            province = st.text_input("Province", value="")
-        with col5:
-            cong_district = st.selectbox("Congressional District", ["District 1", "District 2"])
-        with col6:
-            region = st.selectbox("Region", [
-                "Region I", "Region II", "Region III", "Region IV-A", "Region IV-B", "Region V",
-                "Region VI", "Region VII", "Region VIII", "Region IX", "Region X", "Region XI",
-                "Region XII", "Region XIII", "NCR", "CAR", "BARMM"
-            ])
+             # ✅ ADDRESS INFORMATION
+            st.markdown("### 📍 Address Information")
+
+            # Row 1: Number & Street + Barangay
+            col1, col2 = st.columns(2)
+            with col1:
+                number_street = st.text_input("Number & Street", value="")
+            with col2:
+                barangay = st.text_input("Barangay", value="")
+
+           # Row 2: Municipality + Province + Congressional District + Region
+            col3, col4, col5, col6 = st.columns(4)
+            with col3:
+                municipality = st.text_input("Municipality", value="")
+            with col4:
+                province = st.text_input("Province", value="")
+            with col5:
+                cong_district = st.selectbox("Congressional District", ["District 1", "District 2"])
+            with col6:
+                region = st.selectbox("Region", [
+                    "Region I", "Region II", "Region III", "Region IV-A", "Region IV-B", "Region V",
+                    "Region VI", "Region VII", "Region VIII", "Region IX", "Region X", "Region XI",
+                    "Region XII", "Region XIII", "NCR", "CAR", "BARMM"
+                ])
            
         
     
-        employment_status = st.selectbox("Employment Status", [
-            "Unemployed",
-            "Wage Employed",
-            "Underemployed",
-            "Self-Employed"
-        ])
-        employment_type = st.selectbox("Employment Type", [
-            "None",
-            "Casual",
-            "Probationary",
-            "Contractual",
-            "Regular",
-            "Job Order",
-            "Permanent",
-            "Temporary"
-        ])
+            employment_status = st.selectbox("Employment Status", [
+                "Unemployed",
+                "Wage Employed",
+                "Underemployed",
+                "Self-Employed"
+            ])
+            employment_type = st.selectbox("Employment Type", [
+                "None",
+                "Casual",
+                "Probationary",
+                "Contractual",
+                "Regular",
+                "Job Order",
+                "Permanent",
+                "Temporary"
+            ])
             
-        submitted = st.form_submit_button("Generate PDF")
-
-    # ✅ Add Cancel button outside the form
-    if st.button("❌ Cancel / Close Form"):
-        st.session_state.show_enrolment_form = "idle"
-        st.rerun()
-
-    # ✅ Only run this block if form is submitted
-    if submitted:
-        if not last_name.strip() or not first_name.strip():
-            st.error("Please provide at least your first and last name.")
-        else:
-            data = {
-                "EntryDate": entry_date.strftime("%m/%d/%y"),
-                "LastName": last_name.strip(),
-                "FirstName": first_name.strip(),
-                "MidName": middle_name.strip(),
+            submitted = st.form_submit_button("Generate PDF")
+
+        # ✅ Add Cancel button outside the form
+        st.button("❌ Cancel / Close Form", on_click=close_form)
+
+        # ✅ Only run this block if form is submitted
+        if submitted:
+            if not last_name.strip() or not first_name.strip():
+                st.error("Please provide at least your first and last name.")
+            else:
+                data = {
+                    "EntryDate": entry_date.strftime("%m/%d/%y"),
+                    "LastName": last_name.strip(),
+                    "FirstName": first_name.strip(),
+                    "MidName": middle_name.strip(),
                 
-                "NumberStreet": number_street.strip(),
-                "Barangay": barangay.strip(),
-                "Municipality": municipality.strip(),
-                "Province": province.strip(),
-                "Email": email.strip(),
-                "ContactNo": contact_no.strip(),
-                "CongDistrict": cong_district,
-                "Region": region,
-                "Nationality": nationality,
-                "Sex": sex,
-                "CivilStatus": civil_status,
-
-                "birth_month": birth_month,
-                "birth_day": birth_day,
-                "birth_year": birth_year,
-                "Age": age_input,
+                    "NumberStreet": number_street.strip(),
+                    "Barangay": barangay.strip(),
+                    "Municipality": municipality.strip(),
+                    "Province": province.strip(),
+                    "Email": email.strip(),
+                    "ContactNo": contact_no.strip(),
+                    "CongDistrict": cong_district,
+                    "Region": region,
+                    "Nationality": nationality,
+                    "Sex": sex,
+                    "CivilStatus": civil_status,
+
+                    "birth_month": birth_month,
+                    "birth_day": birth_day,
+                    "birth_year": birth_year,
+                    "Age": age_input,
                 
-                "EmploymentStatus": employment_status,
-                "EmploymentType": employment_type,
-            }
-            
-            # ✅ Generate lowercase filename from form inputs
-            filename = f"{last_name.strip().lower()}_{first_name.strip().lower()}-registration_form.pdf"
+                    "EmploymentStatus": employment_status,
+                    "EmploymentType": employment_type,
+                }
             
-            import tempfile, os
-            try:
-                with st.spinner("Filling PDF..."):
-                    tmp_out = tempfile.NamedTemporaryFile(suffix=".pdf", delete=False)
-                    tmp_out_path = tmp_out.name
-                    tmp_out.close()
-
-                    template_path = "tesdabit_regform.pdf"
-                    ok_err = fill_pdf(template_path, tmp_out_path, data)
+                filename = registration_filename(data)
 
-                    if isinstance(ok_err, tuple):
-                        ok, err = ok_err
+                # ✅ Fill, flatten and serialize on the worker pool (no temp files);
+                # most renders finish within the short inline wait
+                try:
+                    job_id = pdf_jobs.submit(st.session_state.session_key, data, TEMPLATE_PATH)
+                except pdf_jobs.Busy:
+                    st.warning("⏳ Lots of forms are being generated right now. Please press Generate PDF again in a few seconds.")
+                else:
+                    with st.spinner("Filling PDF..."):
+                        state, payload = pdf_jobs.poll(job_id, timeout=pdf_jobs.INLINE_WAIT)
+                    if state == "pending":
+                        st.session_state.pdf_job = {"id": job_id, "filename": filename}
                     else:
-                        ok, err = True, None
+                        show_pdf_result(state, payload, filename)
 
-                if not ok:
-                    st.error(f"PDF generation failed: {err}")
-                else:
-                    # ✅ Flatten the PDF to make it non-editable
-                    from pdfrw import PdfName
-                    flattened_pdf = PdfReader(tmp_out_path)
-                    for page in flattened_pdf.pages:
-                        if PdfName("Annots") in page:
-                            del page[PdfName("Annots")]
-                    PdfWriter().write(tmp_out_path, flattened_pdf)
-
-                   
-
-                    # ✅ Serve the file for download
-                    with open(tmp_out_path, "rb") as f:
-                        st.success("✅ Your TESDA form has been filled and flattened.")
-                        st.download_button(
-                            "📥 Download Your Filled Form",
-                            f,
-                            file_name=filename,
-                            mime="application/pdf",
-                            )
-                        # CANCEL BUTTON clears the form idle
-                        st.session_state.show_enrolment_form = "idle"
-                    
-            except FileNotFoundError:
-                st.error("Template PDF not found. Place tesdabit_regform.pdf in the app folder.")
-            except Exception as e:
-                st.error(f"Failed to generate PDF: {e}")
-            finally:
-                try:
-                    os.remove(tmp_out_path)
-                except Exception:
-                    pass
+    # ✅ Still rendering: poll from a fragment so only it reruns
+    if st.session_state.get("pdf_job"):
+        pdf_job_status()
+
+    # ✅ A job that finished while polling is shown here, once
+    if "pdf_result" in st.session_state:
+        show_pdf_result(*st.session_state.pop("pdf_result"))
+
+
+registration_form()
+
+metrics.observe("app_run_seconds", time.perf_counter() - run_started, scope="app")
@@ -0,0 +1,136 @@
+# ---------------------------------------
+# 🖼️ STATIC IMAGE VARIANTS (banner + "open in browser" guide)
+# ---------------------------------------
+# The page used to pull the full-size PNGs from raw.githubusercontent.com on
+# every load (1.6 MB banner, 370 KB guide). build_assets() writes resized
+# WebP + JPEG variants into ./static, which Streamlit serves at app/static/
+# (.streamlit/config.toml: enableStaticServing). File names carry a hash of
+# the source image, so a URL never changes content and can be cached for
+# good. Streamlit's static route only sends Last-Modified/ETag; to send
+# "Cache-Control: public, max-age=31536000, immutable" put a CDN or proxy in
+# front and point ASSET_BASE_URL at it.
+#
+# Runs at startup (resources.bootstrap) and skips variants that already
+# exist. Pre-build from a shell: python assets.py
+
+import hashlib
+import html
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT, "static")
+ASSET_BASE_URL = os.environ.get("ASSET_BASE_URL", "app/static/")
+
+# name -> (source file, widths in px, original URL used if no variant is built)
+SOURCES = {
+    "bit_banner": ("bit_banner.png", (480, 768, 1200, 1600, 2400, 3200),
+                   "https://raw.githubusercontent.com/ediesonmalabag-source/chat/main/bit_banner.png"),
+    "openinchrome": ("openinchrome.png", (360, 540, 720),
+                     "https://raw.githubusercontent.com/ediesonmalabag-source/chat/main/openinchrome.png"),
+}
+FORMATS = (("webp", "WEBP", {"quality": 80, "method": 6}),
+           ("jpg", "JPEG", {"quality": 82, "optimize": True, "progressive": True}))
+
+# ✅ app.py uses layout="wide": the main column spans the viewport minus
+#    Streamlit's side padding (5rem each side from WIDE_BREAKPOINT up, 1rem below)
+WIDE_BREAKPOINT = 768    # px
+WIDE_SIDE_PADDING = 80   # px per side, desktop
+NARROW_SIDE_PADDING = 16  # px per side, phones
+DEFAULT_SCREEN_WIDTH = 1440  # px; until the device probe reports
+PIXEL_RATIO = 2          # most phones are 2x or more
+SIZES = (f"(min-width: {WIDE_BREAKPOINT}px) calc(100vw - {2 * WIDE_SIDE_PADDING}px), "
+         f"calc(100vw - {2 * NARROW_SIDE_PADDING}px)")
+
+_manifest = {}  # name -> {"webp": [(width, filename)], "jpg": [...]}
+
+
+def _source_hash(path):
+    with open(path, "rb") as f:
+        return hashlib.sha1(f.read()).hexdigest()[:10]
+
+
+def _build_one(name, source, widths):
+    from PIL import Image  # ✅ Pillow ships with Streamlit
+
+    src_path = os.path.join(ROOT, source)
+    digest = _source_hash(src_path)
+    variants = {ext: [] for ext, _, _ in FORMATS}
+    wanted = set()
+    with Image.open(src_path) as original:
+        original.load()
+        usable = sorted({min(w, original.width) for w in widths})
+        for width in usable:
+            resized = None
+            for ext, fmt, options in FORMATS:
+                filename = f"{name}.{digest}.{width}w.{ext}"
+                wanted.add(filename)
+                variants[ext].append((width, filename))
+                out_path = os.path.join(STATIC_DIR, filename)
+                if os.path.exists(out_path):
+                    continue
+                if resized is None:
+                    height = round(original.height * width / original.width)
+                    resized = original.resize((width, height), Image.LANCZOS)
+                image = resized
+                if fmt == "JPEG" and image.mode != "RGB":
+                    # ✅ JPEG has no alpha: flatten onto white like the page background
+                    background = Image.new("RGB", image.size, "white")
+                    background.paste(image, mask=image.convert("RGBA").getchannel("A"))
+                    image = background
+                tmp_path = out_path + ".part"
+                image.save(tmp_path, fmt, **options)
+                os.replace(tmp_path, out_path)
+
+    # ✅ Drop variants of an older version of the same source
+    for filename in os.listdir(STATIC_DIR):
+        if filename.startswith(name + ".") and filename not in wanted:
+            os.remove(os.path.join(STATIC_DIR, filename))
+    return variants
+
+
+def build_assets():
+    """Write missing variants for every source image; returns the manifest."""
+    os.makedirs(STATIC_DIR, exist_ok=True)
+    for name, (source, widths, _) in SOURCES.items():
+        _manifest[name] = _build_one(name, source, widths)
+    return _manifest
+
+
+def content_width(screen_width):
+    # ✅ CSS px of the wide layout's main column (sidebar open makes it narrower, never wider)
+    screen_width = screen_width or DEFAULT_SCREEN_WIDTH
+    padding = WIDE_SIDE_PADDING if screen_width >= WIDE_BREAKPOINT else NARROW_SIDE_PADDING
+    return max(screen_width - 2 * padding, 1)
+
+
+def pick_width(widths, screen_width):
+    target = content_width(screen_width) * PIXEL_RATIO
+    for width in widths:
+        if width >= target:
+            return width
+    return widths[-1]
+
+
+def image_html(name, screen_width, alt="", style="width:100%; height:auto;"):
+    """<picture> for an asset: WebP srcset with a JPEG fallback sized for screen_width."""
+    variants = _manifest.get(name)
+    alt = html.escape(alt, quote=True)
+    if not variants:
+        return f'<img src="{SOURCES[name][2]}" alt="{alt}" style="{style}">'
+    webp = ", ".join(f"{ASSET_BASE_URL}{f} {w}w" for w, f in variants["webp"])
+    jpg = dict(variants["jpg"])
+    src = ASSET_BASE_URL + jpg[pick_width(sorted(jpg), screen_width)]
+    return (
+        f'<picture><source type="image/webp" srcset="{webp}" sizes="{SIZES}">'
+        f'<img src="{src}" alt="{alt}" style="{style}" decoding="async"></picture>'
+    )
+
+
+if __name__ == "__main__":
+    for name, variants in build_assets().items():
+        for ext, files in variants.items():
+            for width, filename in files:
+                size = os.path.getsize(os.path.join(STATIC_DIR, filename))
+                print(f"{name:>13} {ext:>4} {width:>5}w {size:>9,} B  static/{filename}")
+    sys.exit(0)
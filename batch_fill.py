@@ -0,0 +1,188 @@
+# ---------------------------------------
+# 📦 BULK REGISTRATION PDF GENERATION
+# ---------------------------------------
+# Generates one filled + flattened registration PDF per row of a CSV or
+# JSONL file, in parallel across a process pool, streaming results into a
+# ZIP as they complete. Rows use the same keys as the Streamlit form's
+# `data` dict (LastName, FirstName, Sex, CivilStatus, ...).
+#
+# Usage:
+#   python batch_fill.py registrants.csv -o registrations.zip [--workers 4]
+
+import argparse
+import csv
+import io
+import json
+import os
+import re
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import pdf_fill
+import pdf_incremental
+
+REQUIRED_FIELDS = ("LastName", "FirstName")
+
+
+def read_rows(path):
+    """Yield (row_number, data dict) from a .csv or .jsonl/.ndjson file."""
+    ext = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        if ext == ".csv":
+            for number, row in enumerate(csv.DictReader(f), start=2):  # header is line 1
+                yield number, row
+        elif ext in (".jsonl", ".ndjson"):
+            for number, line in enumerate(f, start=1):
+                if line.strip():
+                    yield number, line
+        else:
+            raise ValueError(f"Unsupported input type {ext!r}; use .csv or .jsonl")
+
+
+def normalize_row(row):
+    # ✅ Same shape as the form: stripped strings, required names present
+    if isinstance(row, str):
+        row = json.loads(row)
+    if not isinstance(row, dict):
+        raise ValueError("row is not an object")
+    data = {k: (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k and v is not None}
+    missing = [k for k in REQUIRED_FIELDS if not data.get(k)]
+    if missing:
+        raise ValueError(f"missing {', '.join(missing)}")
+    return data
+
+
+def _init_worker(template_path):
+    pdf_fill.warm_template(template_path)
+
+
+def render_row(task):
+    # Runs in a worker process; never raises so one bad row can't sink the batch
+    number, row, template_path = task
+    try:
+        data = normalize_row(row)
+        return number, pdf_fill.registration_filename(data), pdf_fill.render_registration_pdf(data, template_path), None
+    except Exception as e:
+        return number, None, None, f"{type(e).__name__}: {e}"
+
+
+def _safe_name(name, number):
+    # ✅ Names come from row data: keep one plain path component (no zip-slip)
+    stem = name[:-4] if name.lower().endswith(".pdf") else name
+    stem = re.sub(r"[^\w\-]+", "_", stem).strip("_-")  # separators and dots go too
+    return f"{stem or f'row{number}'}.pdf"
+
+
+def _unique_name(name, number, used):
+    name = _safe_name(name, number)
+    if name not in used:
+        used.add(name)
+        return name
+    stem, ext = os.path.splitext(name)
+    name = f"{stem}-row{number}{ext}"
+    used.add(name)
+    return name
+
+
+def run_batch(input_path, output, template_path=None, workers=None, max_pending=None, progress=None):
+    """Render every row of input_path into a ZIP written to output (path or file object).
+
+    Returns a report dict with counts, elapsed seconds, forms/sec and per-row failures.
+    """
+    template_path = template_path or pdf_fill.TEMPLATE_PATH
+    workers = workers or os.cpu_count() or 1
+    # ✅ Bound in-flight rows so memory stays flat regardless of batch size
+    max_pending = max_pending or workers * 4
+
+    failures = []
+    ok = 0
+    used_names = set()
+    start = time.perf_counter()
+
+    def new_pool():
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(template_path,))
+
+    with zipfile.ZipFile(output, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        pool = new_pool()
+        pending = {}  # future -> row number
+
+        def drain(done):
+            nonlocal ok
+            for future in done:
+                number = pending.pop(future)
+                try:
+                    number, name, pdf_bytes, error = future.result()
+                except BrokenProcessPool as e:
+                    # ✅ A worker died (OOM kill, segfault): its rows fail, the batch goes on
+                    name, pdf_bytes, error = None, None, f"BrokenProcessPool: {e}"
+                if not error:
+                    try:
+                        pdf_bytes = pdf_fill.attach_template(pdf_bytes)
+                    except ValueError as e:
+                        error = f"ValueError: {e}"
+                if error:
+                    failures.append({"row": number, "error": error})
+                else:
+                    # ✅ An incremental PDF is written as template + update, without joining them
+                    with zf.open(_unique_name(name, number, used_names), "w") as f:
+                        for chunk in pdf_incremental.chunks(pdf_bytes):
+                            f.write(chunk)
+                    ok += 1
+                if progress:
+                    progress(ok, len(failures))
+
+        try:
+            for number, row in read_rows(input_path):
+                try:
+                    future = pool.submit(render_row, (number, row, template_path))
+                except BrokenProcessPool:
+                    # ✅ Settle what the broken pool still holds, then carry on with a fresh one
+                    drain(wait(pending)[0])
+                    pool.shutdown(wait=False)
+                    pool = new_pool()
+                    future = pool.submit(render_row, (number, row, template_path))
+                pending[future] = number
+                if len(pending) >= max_pending:
+                    drain(wait(pending, return_when=FIRST_COMPLETED)[0])
+            drain(wait(pending)[0])
+        finally:
+            pool.shutdown(cancel_futures=True)
+
+        if failures:
+            report_csv = io.StringIO()
+            writer = csv.DictWriter(report_csv, fieldnames=["row", "error"])
+            writer.writeheader()
+            writer.writerows(sorted(failures, key=lambda f: f["row"]))
+            zf.writestr("_failures.csv", report_csv.getvalue())
+
+    elapsed = time.perf_counter() - start
+    return {
+        "generated": ok,
+        "failed": len(failures),
+        "elapsed_s": elapsed,
+        "forms_per_s": ok / elapsed if elapsed else 0.0,
+        "failures": sorted(failures, key=lambda f: f["row"]),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate registration PDFs from a CSV/JSONL of registrants.")
+    parser.add_argument("input", help="registrants .csv or .jsonl")
+    parser.add_argument("-o", "--output", default="registrations.zip", help="output ZIP (default: registrations.zip)")
+    parser.add_argument("--template", default=pdf_fill.TEMPLATE_PATH)
+    parser.add_argument("--workers", type=int, default=None, help="process count (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    report = run_batch(args.input, args.output, args.template, args.workers)
+    for failure in report["failures"]:
+        print(f"⚠️ row {failure['row']}: {failure['error']}", file=sys.stderr)
+    print(f"✅ {report['generated']} generated, {report['failed']} failed in "
+          f"{report['elapsed_s']:.2f}s ({report['forms_per_s']:.1f} forms/sec) -> {args.output}")
+    return 1 if report["failed"] and not report["generated"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
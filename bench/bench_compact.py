@@ -0,0 +1,91 @@
+# ---------------------------------------
+# 🗜️ Output compaction benchmark: bytes and time, before vs after
+# ---------------------------------------
+# Usage: python bench/bench_compact.py [--rounds 20] [--link-kbps 400] [--output incremental]
+# "before" is the old flatten path: fill a copy of the full template, drop
+# /Annots, write everything that is still reachable, no compaction.
+# "after" is render_registration_pdf() as served. The last column weighs the
+# render time difference against the transfer time saved on a slow link
+# (Messenger's in-app browser on mobile data), so compaction never costs
+# more than it saves. Pages are rasterized (if PyMuPDF is installed) to check
+# the output still looks identical. --output incremental measures the
+# appended-update writer (pdf_incremental) as "after" instead.
+
+import argparse
+import os
+import sys
+import time
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "bench"))
+
+from pdfrw import PdfWriter  # noqa: E402
+
+import pdf_fill  # noqa: E402
+from bench_suite import pdf_cases  # noqa: E402
+
+
+def before(data, engine):
+    template_pdf = pdf_fill.fill_template(pdf_fill.TEMPLATE_PATH, data, engine)
+    pdf_fill.flatten(template_pdf)
+    out = BytesIO()
+    PdfWriter().write(out, template_pdf)
+    return out.getvalue()
+
+
+def after(data, engine, output=None):
+    return bytes(pdf_fill.render_registration_pdf(data, engine=engine, output=output))
+
+
+def median_ms(fn, rounds):
+    fn()
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return timings[len(timings) // 2] * 1000
+
+
+def same_pixels(a, b):
+    try:
+        import pymupdf
+    except ImportError:
+        return None
+    with pymupdf.open(stream=a, filetype="pdf") as doc_a, pymupdf.open(stream=b, filetype="pdf") as doc_b:
+        if len(doc_a) != len(doc_b):
+            return False
+        return all(pa.get_pixmap(dpi=72).samples == pb.get_pixmap(dpi=72).samples for pa, pb in zip(doc_a, doc_b))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare PDF output before/after compaction.")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--link-kbps", type=float, default=400, help="slow mobile link to weigh bytes against")
+    parser.add_argument("--engine", default=None, help="direct | native | reportlab (default: PDF_FILL_ENGINE)")
+    parser.add_argument("--output", default=None, help="rewrite | incremental (default: PDF_OUTPUT)")
+    args = parser.parse_args()
+
+    os.chdir(ROOT)
+    ms_per_byte = 8 / args.link_kbps  # kbit/s -> ms per byte
+    print(f"{'case':>14} {'before B':>9} {'after B':>9} {'saved':>7} {'before ms':>10} {'after ms':>9} "
+          f"{'net ms @' + str(int(args.link_kbps)) + 'k':>12}  same")
+    failed = False
+    for name, data in pdf_cases().items():
+        old, new = before(data, args.engine), after(data, args.engine, args.output)
+        old_ms = median_ms(lambda: before(data, args.engine), args.rounds)
+        new_ms = median_ms(lambda: after(data, args.engine, args.output), args.rounds)
+        saved = len(old) - len(new)
+        net = saved * ms_per_byte + (old_ms - new_ms)
+        same = same_pixels(old, new)
+        failed |= same is False or net < 0
+        print(f"{name:>14} {len(old):>9,} {len(new):>9,} {saved / len(old):>6.1%} {old_ms:>10.2f} {new_ms:>9.2f} "
+              f"{net:>+12.1f}  {'-' if same is None else same}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,90 @@
+# ---------------------------------------
+# 🧩 Full-script rerun vs fragment reruns of app.py (headless, offline)
+# ---------------------------------------
+# Usage: python bench/bench_fragments.py [--rounds 30]
+# Times what one interaction costs on the server: the whole script (page
+# load, sidebar Reset, ?form=1) against a rerun of just the chat, bottom
+# buttons or registration form fragment, with the form open and a few chat
+# turns in the history. AppTest reruns the whole script for widget changes,
+# so fragment reruns are requested the way the browser does it: the rerun
+# carries the fragment's id. "script ms" is app.py's own app_run_seconds
+# (what /metrics shows per scope); "run ms" adds AppTest's per-run set-up.
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import metrics  # noqa: E402
+
+SCOPES = ["chat", "buttons", "form"]
+
+
+def script_seconds(scope):
+    # ✅ (sum, count) of app_run_seconds{scope} as exported
+    values = {}
+    for line in metrics.render().splitlines():
+        for field in ("sum", "count"):
+            if line.startswith(f'app_run_seconds_{field}{{scope="{scope}"}}'):
+                values[field] = float(line.rsplit(" ", 1)[1])
+    return values.get("sum", 0.0), values.get("count", 0.0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time full-script vs fragment reruns of app.py.")
+    parser.add_argument("--rounds", type=int, default=30)
+    args = parser.parse_args()
+
+    from streamlit.testing.v1 import AppTest, local_script_runner
+
+    os.chdir(ROOT)
+    queue = []
+    rerun_data = local_script_runner.RerunData
+
+    def with_fragment_ids(**kwargs):
+        if queue:
+            kwargs["fragment_id_queue"] = list(queue)
+        return rerun_data(**kwargs)
+
+    local_script_runner.RerunData = with_fragment_ids
+
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60).run()
+    for message in ("hello", "cookery", "how do I enrol", "contact"):
+        at.chat_input[0].set_value(message)
+        at.run()
+    at.query_params["form"] = "1"
+    at.run()
+    storage = at._fragment_storage
+
+    def measure(scope, fragment_ids):
+        queue[:] = fragment_ids
+        at.run()
+        before = script_seconds(scope)
+        timings = []
+        for _ in range(args.rounds):
+            start = time.perf_counter()
+            at.run()
+            timings.append(time.perf_counter() - start)
+            if at.exception:
+                raise SystemExit(f"app raised: {at.exception[0].message}")
+        queue[:] = []
+        after = script_seconds(scope)
+        timings.sort()
+        runs = after[1] - before[1]
+        script_ms = (after[0] - before[0]) / runs * 1000 if runs else float("nan")
+        return script_ms, timings[len(timings) // 2] * 1000, int(runs)
+
+    full = measure("app", [])
+    print(f"{'rerun':>8} {'script ms':>10} {'vs full':>8} {'run ms':>8} {'counted':>8}")
+    print(f"{'app':>8} {full[0]:>10.2f} {'':>8} {full[1]:>8.2f} {full[2]:>8}")
+    for scope in SCOPES:
+        script_ms, run_ms, runs = measure(scope, storage.resolve_target(scope))
+        print(f"{scope:>8} {script_ms:>10.2f} {script_ms / full[0]:>8.0%} {run_ms:>8.2f} {runs:>8}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
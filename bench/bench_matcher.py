@@ -0,0 +1,65 @@
+# ---------------------------------------
+# ⏱️ Intent matcher scaling: Aho-Corasick automaton vs per-keyword scans
+# ---------------------------------------
+# Usage: python bench/bench_matcher.py [--sizes 10,100,1000,5000]
+# Latency of the automaton should stay flat as the keyword count grows;
+# the old `any(kw in message for kw in ...)` style grows linearly.
+
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from chatbot import KeywordAutomaton, normalize_message  # noqa: E402
+
+MESSAGES = [
+    "qualifications",
+    "enrolment",
+    "Hi! How do I enrol in Cookery NC II?",
+    "what are the requirements for the assessment of computer systems servicing",
+    "can you help me with the bread and pastry production schedule please",
+    "is there a motorcycle small engine servicing course available this month",
+    "random text that matches nothing at all in the catalog whatsoever",
+]
+
+
+def synthetic_keywords(count, seed=7):
+    rng = random.Random(seed)
+    words = set()
+    while len(words) < count:
+        words.add("".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(5, 14))))
+    return sorted(words)
+
+
+def per_message_us(fn, messages, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for message in messages:
+            fn(message)
+    return (time.perf_counter() - start) / (rounds * len(messages)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark keyword matching as the keyword count grows.")
+    parser.add_argument("--sizes", default="10,100,1000,5000")
+    parser.add_argument("--rounds", type=int, default=200)
+    args = parser.parse_args()
+
+    messages = [normalize_message(m) for m in MESSAGES]
+    print(f"{'keywords':>9} {'automaton µs/msg':>17} {'linear scan µs/msg':>19} {'build ms':>9}")
+    for size in (int(s) for s in args.sizes.split(",")):
+        keywords = synthetic_keywords(size) + ["cookery", "computer", "enrol", "assessment", "help"]
+        start = time.perf_counter()
+        automaton = KeywordAutomaton((kw, i) for i, kw in enumerate(keywords))
+        build_ms = (time.perf_counter() - start) * 1000
+        fast = per_message_us(automaton.find_all, messages, args.rounds)
+        slow = per_message_us(lambda m: [kw for kw in keywords if kw in m], messages, max(1, args.rounds // 10))
+        print(f"{len(keywords):>9} {fast:>17.2f} {slow:>19.2f} {build_ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+# ---------------------------------------
+# ⏱️ Fill engine benchmark: ReportLab canvas round-trip vs direct stream vs
+#    native AcroForm values (time and bytes, flattened and editable output)
+# ---------------------------------------
+# Usage: python bench/bench_overlay.py [--rounds 50]
+# Run from the repository root (the template and font paths are relative).
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pdf_fill  # noqa: E402
+
+SAMPLE = {
+    "EntryDate": "10/18/26",
+    "LastName": "Peñaflor-Muñoz",
+    "FirstName": "María Niña",
+    "MidName": "Santos",
+    "NumberStreet": "12 Rizal St",
+    "Barangay": "Manayon",
+    "Municipality": "Bangui",
+    "Province": "Ilocos Norte",
+    "Email": "juan@example.ph",
+    "ContactNo": "0908-860-0955",
+    "CongDistrict": "District 1",
+    "Region": "Region I",
+    "Nationality": "Filipino",
+    "Sex": "Female",
+    "CivilStatus": "Married",
+    "birth_month": "March",
+    "birth_day": 4,
+    "birth_year": 2000,
+    "Age": "26",
+    "EmploymentStatus": "Wage Employed",
+    "EmploymentType": "Regular",
+}
+
+
+ENGINES = ("reportlab", "direct", "native")
+
+
+def run(engine, rounds, flat=True):
+    pdf_fill.render_registration_pdf(SAMPLE, engine=engine, flat=flat)  # warm caches
+    timings = []
+    size = 0
+    for _ in range(rounds):
+        start = time.perf_counter()
+        size = len(pdf_fill.render_registration_pdf(SAMPLE, engine=engine, flat=flat))
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        "engine": engine if flat else f"{engine} form",
+        "median_ms": timings[len(timings) // 2] * 1000,
+        "min_ms": timings[0] * 1000,
+        "bytes": size,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare overlay engines.")
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    for flat in (True, False):
+        results = [run(engine, args.rounds, flat) for engine in ENGINES]
+        for r in results:
+            print(f"{r['engine']:>14}: median {r['median_ms']:7.2f} ms   min {r['min_ms']:7.2f} ms   {r['bytes']:>8} bytes")
+        base = results[0]
+        for new in results[1:]:
+            print(f"{new['engine']:>14} vs {base['engine']}: speedup {base['median_ms'] / new['median_ms']:.2f}x"
+                  f"   size delta {new['bytes'] - base['bytes']:+d} bytes")
+        print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# ---------------------------------------
+# 🧠 Per-session chat history memory: (role, html) tuples vs shared response-id records
+# ---------------------------------------
+# Usage: python bench/bench_session_memory.py [--turns 20,100,200] [--sessions 500]
+# Three views of one session's history:
+#   owned   - bytes only this session holds (strings shared process-wide,
+#             e.g. catalog HTML held by reference, are not counted)
+#   naive   - every string counted, as if each session had its own copy
+#   pickled - serialized size (what a persisted / serializable session costs)
+
+import argparse
+import os
+import pickle
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import chatbot  # noqa: E402
+from chatbot import respond, bot_message, user_message  # noqa: E402
+
+MESSAGES = [
+    "hello",
+    "qualifications",
+    "cookery",
+    "how do I enrol?",
+    "contact",
+    "assessment schedule for computer systems servicing",
+    "something the bot will not understand",
+    "bread and pastry",
+]
+
+
+def _shared_ids():
+    shared = set()
+    for response_id in chatbot.response_table:
+        shared.update((id(response_id), id(chatbot.response_html(response_id))))
+    shared.update((id("You"), id("Bot")))
+    shared.update(id(record) for record in chatbot.bot_records.values())
+    return shared
+
+
+def deep_size(obj, shared=frozenset(), seen=None):
+    seen = set() if seen is None else seen
+    if id(obj) in seen or id(obj) in shared:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, (list, tuple)):
+        size += sum(deep_size(item, shared, seen) for item in obj)
+    return size
+
+
+def history(turns, records, seed=0):
+    messages = [bot_message("welcome") if records else ("Bot", chatbot.WELCOME_RESPONSE)]
+    for i in range(turns):
+        # ✅ Fresh str per user turn, like real chat input
+        text = "%s #%d-%d" % (MESSAGES[(i + seed) % len(MESSAGES)], seed, i)
+        response_id, html = respond(text)
+        if records:
+            messages += [user_message(text), bot_message(response_id)]
+        else:
+            messages += [("You", text), ("Bot", html)]
+    return messages
+
+
+def measure(turns, records, shared):
+    messages = history(turns, records)
+    return {
+        "owned": deep_size(messages, shared),
+        "naive": deep_size(messages),
+        "pickled": len(pickle.dumps(messages, protocol=pickle.HIGHEST_PROTOCOL)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compare per-session chat history memory.")
+    parser.add_argument("--turns", default="20,100,200")
+    parser.add_argument("--sessions", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    for turns in [int(t) for t in args.turns.split(",")]:
+        history(turns, True)  # ✅ first use of each id creates its shared record
+    shared = _shared_ids()
+    print(f"{'turns':>6} {'format':>8} {'owned B':>10} {'naive B':>10} {'pickled B':>10}"
+          f" {'owned x' + str(args.sessions):>14}")
+    for turns in [int(t) for t in args.turns.split(",")]:
+        for label, records in (("tuples", False), ("records", True)):
+            r = measure(turns, records, shared)
+            print(f"{turns:>6} {label:>8} {r['owned']:>10,} {r['naive']:>10,} {r['pickled']:>10,}"
+                  f" {r['owned'] * args.sessions / 1e6:>12.1f}MB")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+# ---------------------------------------
+# ⏱️ Microbenchmark suite: PDF filling + chatbot replies, with golden outputs
+# ---------------------------------------
+# Usage: python bench/bench_suite.py [--rounds 20] [--json results.json]
+#                                    [--compare old.json] [--update-golden]
+# Cases:
+#   pdf  - every value of every checkbox group (CHECKBOX_GROUPS), long ñ
+#          names, and a non-cp1252 name (ReportLab fallback engine)
+#   chat - one message per intent in the live catalog, plus the fallback
+# Per case: median/min wall time, tracemalloc peak + retained bytes for one
+# call, and for PDFs the byte size and sha256 of the flattened output.
+# Flattened hashes must match bench/golden_pdfs.json (exit 1 otherwise), so
+# an optimization can't silently change the rendered form. Re-bless with
+# --update-golden after an intended output change.
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from hashlib import sha256
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import chatbot  # noqa: E402
+import pdf_fill  # noqa: E402
+
+GOLDEN_PATH = os.path.join(ROOT, "bench", "golden_pdfs.json")
+
+BASE = {
+    "EntryDate": "10/18/26",
+    "LastName": "Dela Cruz",
+    "FirstName": "Juan",
+    "MidName": "Santos",
+    "NumberStreet": "12 Rizal St",
+    "Barangay": "Manayon",
+    "Municipality": "Bangui",
+    "Province": "Ilocos Norte",
+    "Email": "juan@example.ph",
+    "ContactNo": "0908-860-0955",
+    "CongDistrict": "District 1",
+    "Region": "Region I",
+    "Nationality": "Filipino",
+    "birth_month": "March",
+    "birth_day": 4,
+    "birth_year": 2000,
+    "Age": "26",
+}
+
+
+def pdf_cases():
+    # ✅ Case i takes value i of every group (wrapping), so every value is drawn at least once
+    groups = {key: list(values) for key, values in pdf_fill.CHECKBOX_GROUPS.items()}
+    cases = {}
+    for i in range(max(len(values) for values in groups.values())):
+        data = dict(BASE)
+        for key, values in groups.items():
+            data[key] = values[i % len(values)]
+        cases[f"groups-{i}"] = data
+    cases["unicode-long"] = dict(
+        cases["groups-1"],
+        LastName="Peñaflor-Muñoz y Castañeda de los Santos",
+        FirstName="María Niña Concepción",
+        MidName="Ñañez",
+        NumberStreet="Purok Señor Santo Niño, Calle Añonuevo",
+        Municipality="Dasmariñas",
+    )
+    cases["non-cp1252"] = dict(cases["groups-2"], LastName="Nguyễn", FirstName="Thị Ánh")
+    return cases
+
+
+def chat_cases():
+    """intent_id -> a message that must resolve to it."""
+    current = chatbot.load_catalog()
+    keywords = {
+        "greeting": sorted(chatbot.GREETINGS)[0],
+        "enrolment": chatbot.ENROLMENT_KEYWORDS[0],
+        "contact": chatbot.CONTACT_KEYWORDS[0],
+        "qualifications": chatbot.QUALIFICATIONS_KEYWORDS[0],
+        "assessment": chatbot.ASSESSMENT_KEYWORDS[0],
+    }
+    for alias, response in chatbot.qualification_responses.items():
+        keywords.setdefault(f"qualification:{getattr(response, 'id', alias)}", alias)
+    cases = {}
+    for intent_id, _ in current.intents:
+        message = keywords[intent_id]
+        cases[intent_id] = f"Hi! Tell me about {message}?" if intent_id != "greeting" else message
+    cases["fallback"] = "zzz nothing in the catalog matches this"
+    for intent_id, message in cases.items():
+        got = chatbot.respond(message)[0]
+        if got != intent_id:
+            raise AssertionError(f"message {message!r} resolved to {got!r}, expected {intent_id!r}")
+    return cases
+
+
+def measure(fn, rounds):
+    fn()  # ✅ warm caches
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+
+    tracemalloc.start()
+    try:
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        result = fn()
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, {
+        "median_us": round(timings[len(timings) // 2] * 1e6, 1),
+        "min_us": round(timings[0] * 1e6, 1),
+        "alloc_peak_bytes": peak - before,
+        "alloc_retained_bytes": current - before,
+    }
+
+
+def run_suite(rounds):
+    results = {"pdf": {}, "fill_pdf": {}, "chat": {}, "chat_uncached": {}}
+    tmp_dir = tempfile.mkdtemp(prefix="bench_suite_")
+    for name, data in pdf_cases().items():
+        pdf, stats = measure(lambda: pdf_fill.render_registration_pdf(data), rounds)
+        pdf = bytes(pdf)
+        results["pdf"][name] = dict(stats, bytes=len(pdf), sha256=sha256(pdf).hexdigest())
+
+        out_path = os.path.join(tmp_dir, f"{name}.pdf")
+        (ok, error), stats = measure(lambda: pdf_fill.fill_pdf(pdf_fill.TEMPLATE_PATH, out_path, data), rounds)
+        if not ok:
+            raise RuntimeError(f"fill_pdf failed for {name}: {error}")
+        results["fill_pdf"][name] = dict(stats, bytes=os.path.getsize(out_path))
+
+    for intent_id, message in chat_cases().items():
+        _, results["chat"][intent_id] = measure(lambda: chatbot.chatbot_response(message), rounds * 50)
+
+        def uncached():
+            chatbot.response_cache.clear()
+            return chatbot.chatbot_response(message)
+        _, results["chat_uncached"][intent_id] = measure(uncached, rounds * 50)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def check_golden(results, update=False):
+    hashes = {name: r["sha256"] for name, r in results["pdf"].items()}
+    if update or not os.path.exists(GOLDEN_PATH):
+        with open(GOLDEN_PATH, "w") as f:
+            json.dump(hashes, f, indent=2, sort_keys=True)
+            f.write("\n")
+        return []
+    with open(GOLDEN_PATH) as f:
+        golden = json.load(f)
+    return [f"{name}: {hashes.get(name)} != golden {expected}"
+            for name, expected in golden.items() if hashes.get(name) != expected]
+
+
+def print_compare(results, old):
+    print(f"\n{'section':>14} {'case':>36} {'old µs':>10} {'new µs':>10} {'change':>8}")
+    for section, cases in results["results"].items():
+        for name, stats in cases.items():
+            before = old.get("results", {}).get(section, {}).get(name)
+            if before:
+                change = (stats["median_us"] / before["median_us"] - 1) * 100 if before["median_us"] else 0
+                print(f"{section:>14} {name[:36]:>36} {before['median_us']:>10} {stats['median_us']:>10} {change:>+7.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="PDF filling and chatbot microbenchmarks.")
+    parser.add_argument("--rounds", type=int, default=20, help="timed calls per PDF case (x50 for chat)")
+    parser.add_argument("--json", help="write results here")
+    parser.add_argument("--compare", help="previous --json results to diff against")
+    parser.add_argument("--update-golden", action="store_true", help="re-bless the flattened PDF hashes")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)  # ✅ template and font paths are relative
+    results = {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "rounds": args.rounds,
+        "results": run_suite(args.rounds),
+    }
+    mismatches = check_golden(results["results"], args.update_golden)
+    results["golden_mismatches"] = mismatches
+
+    for section, cases in results["results"].items():
+        print(f"\n{section}")
+        for name, s in cases.items():
+            size = f" {s['bytes']:>8,} B" if "bytes" in s else ""
+            print(f"  {name[:36]:>36} {s['median_us']:>10} µs  peak {s['alloc_peak_bytes']:>9,} B{size}")
+    if args.compare:
+        with open(args.compare) as f:
+            print_compare(results, json.load(f))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+    for mismatch in mismatches:
+        print(f"❌ golden mismatch {mismatch}", file=sys.stderr)
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,253 @@
+# ---------------------------------------
+# 🏋️ Concurrent-session load test for app.py (headless, offline)
+# ---------------------------------------
+# Usage: python bench/load_app.py [--sessions 8] [--turns 12] [--forms 1]
+#                                 [--thresholds bench/load_thresholds.json] [--json out.json]
+# Each session is its own AppTest (own session state, shared process-wide
+# modules, like sessions on one replica) driven from its own thread: chat
+# messages, the four bottom buttons, then the ?form=1 link and a filled
+# "Generate PDF" submit, rerun until the worker pool's result is shown
+# (retrying when the app answers "busy"). Reports p50/p95/p99 per turn kind
+# and peak RSS, and exits 1 when a threshold is exceeded or a session hits an exception.
+# Peak RSS is this process (the app, every session and the harness) plus the
+# PDF worker processes: the live ones' high-water marks, or the largest
+# reaped child's when none are left.
+#
+# AppTest swaps process globals (Runtime._instance, config) around each run,
+# so script runs are serialized with a lock while the sessions themselves
+# stay concurrent. That is close to a real replica, where CPU-bound reruns
+# already take turns on the GIL: latency includes the wait for the lock
+# (queueing), and "service" is the time the run itself took.
+#
+# A bottom button reruns only the chat fragment, and AppTest then holds just
+# that fragment's elements; the browser keeps the rest of the page, so the
+# next turn that needs a button first resyncs with an unrecorded full run.
+
+import argparse
+import json
+import os
+import random
+import resource
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(ROOT, "app.py")
+DEFAULT_THRESHOLDS = os.path.join(ROOT, "bench", "load_thresholds.json")
+
+CHAT_MESSAGES = [
+    "hello", "cookery", "what courses are offered?", "how do I enrol", "contact",
+    "assessment schedule", "bread and pastry", "css", "something unrelated",
+]
+BUTTONS = ["🎓 Qualifications", "📝 Enrolment", "📊 Assessment", "📞 Contact"]
+NAMES = [("Dela Cruz", "Juan"), ("Peñaflor", "María"), ("Santos", "Ana"), ("Ibañez", "José")]
+
+POLL_INTERVAL = 0.25  # seconds between reruns while a PDF job is pending
+
+_run_lock = threading.Lock()
+
+
+def percentile(values, pct):
+    # ✅ Nearest-rank percentile
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def _child_pids(pid):
+    pids = []
+    try:
+        for tid in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{tid}/children") as f:
+                pids.extend(int(p) for p in f.read().split())
+    except OSError:
+        return pids
+    for child in list(pids):
+        pids.extend(_child_pids(child))
+    return pids
+
+
+def _vm_hwm_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return 0
+
+
+def peak_rss_mb():
+    # ✅ Linux reports KiB; spawned workers aren't in RUSAGE_CHILDREN until reaped
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    live = sum(_vm_hwm_kb(pid) for pid in _child_pids(os.getpid()))
+    reaped = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return (own + max(live, reaped)) / 1024.0
+
+
+class Session:
+    def __init__(self, index, turns, forms, timeout, record):
+        self.index = index
+        self.turns = turns
+        self.forms = forms
+        self.timeout = timeout
+        self.record = record
+        self.rng = random.Random(index)
+        self.errors = []
+        self.busy = 0
+
+    def _run(self, kind, at):
+        start = time.perf_counter()
+        with _run_lock:
+            began = time.perf_counter()
+            at.run(timeout=self.timeout)
+        end = time.perf_counter()
+        self.record(kind, (end - start) * 1000, (end - began) * 1000)
+        if at.exception:
+            self.errors.append(f"{kind}: {at.exception[0].message}")
+
+    def _button(self, at, label):
+        button = next((b for b in at.button if b.label == label), None)
+        if button is None:
+            with _run_lock:
+                at.run(timeout=self.timeout)  # resync after a fragment-only rerun
+            button = next(b for b in at.button if b.label == label)
+        return button
+
+    def _generate_pdf(self, at):
+        # ✅ Submit, then rerun like the polling fragment until the download
+        # appears; a "busy" answer is retried. "pdf" is click-to-download time.
+        start = time.perf_counter()
+        next(b for b in at.button if b.label == "Generate PDF").click()
+        self._run("pdf_submit", at)
+        while not at.get("download_button") and not at.error:
+            if time.perf_counter() - start > self.timeout:
+                break
+            time.sleep(POLL_INTERVAL)
+            if any("Generate PDF again" in w.value for w in at.warning):
+                self.busy += 1
+                next(b for b in at.button if b.label == "Generate PDF").click()
+                self._run("pdf_submit", at)
+            else:
+                self._run("pdf_poll", at)
+        self.record("pdf", (time.perf_counter() - start) * 1000, None)
+        if not at.get("download_button"):
+            self.errors.append(f"pdf: no download button ({[e.value for e in at.error]})")
+
+    def __call__(self):
+        from streamlit.testing.v1 import AppTest
+
+        try:
+            at = AppTest.from_file(APP_PATH, default_timeout=self.timeout)
+            self._run("load", at)
+            for turn in range(self.turns):
+                if turn % 3 == 2:
+                    self._button(at, self.rng.choice(BUTTONS)).click()
+                    self._run("button", at)
+                else:
+                    at.chat_input[0].set_value(self.rng.choice(CHAT_MESSAGES))
+                    self._run("chat", at)
+            for form in range(self.forms):
+                at.query_params["form"] = "1"
+                self._run("form_open", at)
+                fields = {t.label: t for t in at.text_input}
+                last, first = NAMES[(self.index + form) % len(NAMES)]
+                fields["Last Name"].set_value(last)
+                fields["First Name"].set_value(first)
+                fields["Email"].set_value(f"user{self.index}@example.com")
+                self._generate_pdf(at)
+        except Exception as e:
+            self.errors.append(f"{type(e).__name__}: {e}")
+
+
+def run_load(sessions=8, turns=12, forms=1, timeout=120):
+    samples = {}
+    service = []
+    lock = threading.Lock()
+
+    def record(kind, ms, service_ms):
+        with lock:
+            samples.setdefault(kind, []).append(ms)
+            if service_ms is not None:
+                service.append(service_ms)
+
+    # ✅ Warm-up session (fonts, template, catalog, images) outside the measurement
+    Session(-1, 1, 1, timeout, lambda *sample: None)()
+
+    workers = [Session(i, turns, forms, timeout, record) for i in range(sessions)]
+    threads = [threading.Thread(target=w, name=f"session-{w.index}") for w in workers]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    report = {"sessions": sessions, "turns_per_session": turns, "forms_per_session": forms,
+              "elapsed_s": round(elapsed, 2), "peak_rss_mb": round(peak_rss_mb(), 1),
+              "busy_retries": sum(w.busy for w in workers),
+              "errors": [e for w in workers for e in w.errors], "latency_ms": {}}
+    turn_samples = [ms for kind in ("chat", "button") for ms in samples.get(kind, ())]
+    for kind, values in list(samples.items()) + [("turn", turn_samples), ("service", service)]:
+        report["latency_ms"][kind] = {
+            "count": len(values),
+            "p50": round(percentile(values, 50), 1),
+            "p95": round(percentile(values, 95), 1),
+            "p99": round(percentile(values, 99), 1),
+            "max": round(max(values), 1) if values else 0.0,
+        }
+    return report
+
+
+def check_thresholds(report, thresholds):
+    """Return a list of violated limits; keys look like "turn.p95" (ms) or "peak_rss_mb"."""
+    failures = []
+    for key, limit in thresholds.items():
+        if key == "peak_rss_mb":
+            value = report["peak_rss_mb"]
+        else:
+            kind, stat = key.split(".")
+            value = report["latency_ms"].get(kind, {}).get(stat, 0.0)
+        if value > limit:
+            failures.append(f"{key} = {value} > {limit}")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test for app.py.")
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--turns", type=int, default=12, help="chat/button turns per session")
+    parser.add_argument("--forms", type=int, default=1, help="form submits per session")
+    parser.add_argument("--timeout", type=float, default=120, help="seconds per rerun")
+    parser.add_argument("--thresholds", default=DEFAULT_THRESHOLDS, help="JSON limits file ('' to skip)")
+    parser.add_argument("--json", help="also write the report here")
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)  # ✅ app.py opens the template/fonts by relative path
+    report = run_load(args.sessions, args.turns, args.forms, args.timeout)
+
+    print(f"{args.sessions} sessions, {report['elapsed_s']} s, peak RSS {report['peak_rss_mb']} MB, "
+          f"{report['busy_retries']} busy retries")
+    print(f"{'kind':>10} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for kind, s in report["latency_ms"].items():
+        print(f"{kind:>10} {s['count']:>6} {s['p50']:>9} {s['p95']:>9} {s['p99']:>9} {s['max']:>9}")
+
+    failures = [f"session error: {e}" for e in report["errors"]]
+    if args.thresholds:
+        with open(args.thresholds) as f:
+            failures += check_thresholds(report, json.load(f))
+    report["failures"] = failures
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    for failure in failures:
+        print(f"❌ {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+# ---------------------------------------
+# 💬 CHAT REPLY RENDERING
+# ---------------------------------------
+# Replaces the fixed `time.sleep(0.9)` under "Bot is typing...". Modes:
+#   instant - render the reply right away
+#   typing  - render right away; the browser shows "Bot is typing..." for
+#             CHAT_TYPING_DELAY seconds, then fades the reply in (pure CSS,
+#             the server never waits)
+#   stream  - reveal the reply line by line into a placeholder, sleeping
+#             CHAT_REPLY_PACING seconds between lines (0 = no sleep)
+# HTML replies can't go through st.write_stream (it escapes HTML), so stream
+# mode updates an st.empty() placeholder at line boundaries instead.
+
+import os
+import time
+
+import streamlit as st
+
+import chatbot
+
+REPLY_MODE = os.environ.get("CHAT_REPLY_MODE", "typing")
+TYPING_DELAY = float(os.environ.get("CHAT_TYPING_DELAY", "0.9"))  # browser-side only
+REPLY_PACING = float(os.environ.get("CHAT_REPLY_PACING", "0"))    # server-side; keep 0 in production
+
+TYPING_CSS = """
+<style>
+@keyframes tesda-typing-done { to { visibility: hidden; height: 0; margin: 0; padding: 0; overflow: hidden; } }
+@keyframes tesda-reply-in { from { opacity: 0; } to { opacity: 1; } }
+</style>
+"""
+
+
+def reply_chunks(reply_html):
+    # ✅ Split at line boundaries so partial HTML stays renderable
+    lines = reply_html.splitlines(keepends=True)
+    return lines or [reply_html]
+
+
+def render_reply(reply_html, mode=None, pacing=None, wrap=None):
+    # ✅ wrap(html) -> html puts the (partial) reply in its chat bubble
+    mode = mode or REPLY_MODE
+    pacing = REPLY_PACING if pacing is None else pacing
+    wrap = wrap or (lambda html: html)
+
+    if mode == "stream":
+        placeholder = st.empty()
+        shown = ""
+        for chunk in reply_chunks(reply_html):
+            shown += chunk
+            placeholder.markdown(wrap(shown), unsafe_allow_html=True)
+            if pacing > 0:
+                time.sleep(pacing)
+        return
+
+    if mode == "typing" and TYPING_DELAY > 0:
+        st.markdown(
+            TYPING_CSS
+            + f"<div style='animation: tesda-typing-done 0s linear {TYPING_DELAY}s forwards; color:#666;'>"
+            + "🤖 <i>Bot is typing...</i></div>"
+            + f"<div style='animation: tesda-reply-in 0.25s ease-out {TYPING_DELAY}s both;'>{wrap(reply_html)}</div>",
+            unsafe_allow_html=True,
+        )
+        return
+
+    st.markdown(wrap(reply_html), unsafe_allow_html=True)
+
+
+# ---------------------------------------
+# 🗂️ WINDOWED CHAT HISTORY
+# ---------------------------------------
+# Only the last HISTORY_LIVE messages render live; older ones sit behind a
+# toggle and are only rendered (and sent to the browser) when it is on. Each
+# part goes out as one pre-rendered HTML block, cached in the session by
+# absolute message position, so an unchanged history costs one dict lookup.
+# History is capped at HISTORY_MAX messages per session (oldest dropped).
+
+HISTORY_LIVE = int(os.environ.get("CHAT_HISTORY_LIVE", "12"))
+HISTORY_MAX = int(os.environ.get("CHAT_HISTORY_MAX", "200"))
+
+
+def message_html(message):
+    role, msg = message[0], chatbot.message_body(message)
+    if role == "You":
+        return (
+            f"<div style='background-color:#DCF8C6; padding:10px; border-radius:15px; margin:5px; text-align:right;'>"
+            f"🧑 <b>{role}:</b> {msg}</div>"
+        )
+    return bot_bubble(msg)
+
+
+def bot_bubble(msg):
+    return (
+        f"<div style='background-color:#e6f2ff; padding:10px 15px; border-radius:10px; margin-top:-6px; margin-bottom:10px; color:#003366;'>"
+        f"{msg}"
+        f"</div>"
+    )
+
+
+def trim_history(messages, max_messages=None):
+    # ✅ Drop the oldest messages in place; remember how many went so cache keys stay absolute
+    max_messages = HISTORY_MAX if max_messages is None else max_messages
+    extra = len(messages) - max_messages
+    if extra > 0:
+        del messages[:extra]
+        st.session_state.history_trimmed = st.session_state.get("history_trimmed", 0) + extra
+    return st.session_state.get("history_trimmed", 0)
+
+
+def _history_block(name, messages, start, end, trimmed):
+    cache = st.session_state.setdefault("history_html", {})
+    key = (trimmed + start, trimmed + end)
+    entry = cache.get(name)
+    if entry is None or entry[0] != key:
+        entry = cache[name] = (key, "\n\n".join(message_html(m) for m in messages[start:end]))
+    return entry[1]
+
+
+def render_history(messages, reply=False):
+    """Render the windowed history; reply=True shows the newest (bot) message via render_reply."""
+    trimmed = trim_history(messages)
+    end = len(messages) - 1 if reply and messages else len(messages)
+    split = max(0, end - HISTORY_LIVE)
+
+    if split:
+        if st.toggle(f"🗂️ Show {split} earlier messages", key="history_archive_open"):
+            st.markdown(_history_block("archive", messages, 0, split, trimmed), unsafe_allow_html=True)
+        else:
+            st.session_state.get("history_html", {}).pop("archive", None)
+
+    if end > split:
+        st.markdown(_history_block("live", messages, split, end, trimmed), unsafe_allow_html=True)
+
+    if end < len(messages):
+        # ✅ The new reply is drawn once, in place; next run it is part of the live block
+        render_reply(chatbot.message_body(messages[-1]), wrap=bot_bubble)
+
+
+def reset_history():
+    st.session_state.messages = []
+    for key in ("history_html", "history_trimmed", "history_archive_open", "session_summary"):
+        st.session_state.pop(key, None)
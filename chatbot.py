@@ -0,0 +1,425 @@
+# 🤖 TESDA BIT Chatbot: response catalog and rule-based replies
+# (kept out of app.py so it is built once per process, not on every rerun)
+import hashlib
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+
+import catalog
+import metrics
+
+log = logging.getLogger(__name__)
+
+# ------------------------------------
+# QUALIFICATION CATALOG (qualifications.json, see catalog.py)
+# -------------------------------------
+# Built by load_catalog() on first use (resources.bootstrap() times it), not
+# on import; matcher / qualification_responses stay None until then.
+_catalog = None
+qualification_responses = None
+
+
+# --------------------------
+# Intent responses
+# --------------------------
+GREETING_RESPONSE = "👋 Hi! I'm the TESDA BIT Chatbot. Ask about qualifications, enrolment, assessment, or contact us—just tap a button or type below."
+
+ENROLMENT_RESPONSE = """<h4 style='color:#003366; font-weight:bold;'>📋 TESDA Enrolment Form</h4>
+        You can now fill out your TESDA registration form directly inside this app.<br><br>
+        👉 <a href='?form=1' target='_self' style='font-weight:bold; color:#2C5FA0;'>Click here to fill up the form</a>
+        Once submitted, you'll be able to download your completed PDF instantly.<br><br>
+        ✅ <i>No need to print or scan — it's all digital.</i>
+        """
+
+CONTACT_RESPONSE = """<h4 style='color:#003366; font-weight:bold;'>📞 TESDA-BIT Contact Information</h4>
+        🌐 <b>Facebook Page:</b> <a href='https://www.facebook.com/profile.php?id=61561653118631' target='_blank' style='color:#003366; font-weight:italic;'>Bangui Institute of Technology TESDA</a><br>
+        💬 <b>Messenger Chat:</b> <a href='https://m.me/bit.tesda' target='_blank'>Send a message via Messenger</a><br>
+        📱 <b>Cellphone No.:</b> <a href="tel:09088600955" style="color:#003366; font-weight:italic;">0908-860-0955</a><br>
+        📧 <b>Email:</b> <a href='mailto:bit@tesda.gov.ph'>bit@tesda.gov.ph</a><br>
+        📍 <b>Office Address:</b> TESDA-Bangui Institute of Technology, Brgy. Manayon, Bangui, Ilocos Norte<br><br>
+        🕒 <b>Office Hours:</b> Monday to Friday, 8:00 AM – 5:00 PM<br>
+        📅 <b>Walk-in Inquiries:</b> No appointment needed during office hours<br><br>
+        ✅ <i>For enrolment assistance, document submission, or qualification inquiries, feel free to reach out anytime.</i>
+        """
+
+ASSESSMENT_RESPONSE = "📊 Assessment schedules and requirements vary by qualification. Please contact TESDA BIT for details."
+
+# ❓ Fallback MESSAGE, if no match found
+FALLBACK_RESPONSE = """❓ <b>I couldn’t match your message to a specific qualification, enrolment steps, or assessment details.</b><br><br>
+        Here are a few examples of what you can ask about:<br>
+        • 🍳 Cookery NC II<br>
+        • 💻 Computer Systems Servicing NC II<br>
+        • 🧁 Bread and Pastry Production NC II<br>
+        (…and many more!)<br><br>
+        Type <b>qualification</b> to see the full list.<br><br>
+        You can also ask about:<br>
+        • 📝 Enrolment<br>
+        • 📊 Assessment<br>
+        • 📞 Contact<br><br>
+        Or just tap the buttons below!
+        """
+
+WELCOME_RESPONSE = "👋 Hi there! I'm the TESDA BIT Chatbot. Whether you're on mobile or desktop, I can help you with qualifications, enrolment, assessment, or reaching TESDA BIT. Tap a button or send a message to get started."
+
+# --------------------------
+# Intent keywords (substring match on the normalized message)
+# --------------------------
+GREETINGS = {"hi", "hello", "hey", "haha"}  # exact match only
+ENROLMENT_KEYWORDS = ["enrollment", "enrolment", "enroll", "enrol", "enroling", "enrolling"]
+CONTACT_KEYWORDS = ["contact", "help", "assist", "support", "reach out", "call", "email"]
+QUALIFICATIONS_KEYWORDS = ["qualification", "course", "program", "training", "offered", "available courses"]
+ASSESSMENT_KEYWORDS = ["assessment"]
+
+
+# --------------------------
+# Multi-keyword matcher (Aho-Corasick)
+# --------------------------
+class KeywordAutomaton:
+    """Finds every keyword occurring in a text in one pass, however many keywords there are."""
+
+    def __init__(self, keywords):
+        # keywords: iterable of (keyword, value); a keyword may carry several values
+        self._goto = [{}]
+        self._fail = [0]
+        self._out = [()]
+        for keyword, value in keywords:
+            node = 0
+            for ch in keyword:
+                nxt = self._goto[node].get(ch)
+                if nxt is None:
+                    nxt = self._goto[node][ch] = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(())
+                node = nxt
+            self._out[node] += (value,)
+
+        # ✅ Failure links, breadth first (root children fail to the root)
+        queue = deque(self._goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, nxt in self._goto[node].items():
+                queue.append(nxt)
+                f = self._fail[node]
+                while f and ch not in self._goto[f]:
+                    f = self._fail[f]
+                self._fail[nxt] = self._goto[f].get(ch, 0)
+                self._out[nxt] += self._out[self._fail[nxt]]
+
+    def find_all(self, text):
+        goto, fail, out = self._goto, self._fail, self._out
+        found = set()
+        node = 0
+        for ch in text:
+            while node and ch not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(ch, 0)
+            if out[node]:
+                found.update(out[node])
+        return found
+
+
+class IntentMatcher:
+    """Compiled intents in priority order; the lowest-numbered intent found wins."""
+
+    def __init__(self, qualification_responses, qualifications_response):
+        # ✅ Priority: specific qualifications (catalog order) > greeting > enrolment
+        #    > contact > qualifications list > assessment > fallback
+        self.intents = []  # index = priority -> (intent_id, response)
+        self.qualifications_response = qualifications_response
+        keywords = []
+        by_response = {}
+        for keyword, response in qualification_responses.items():
+            priority = by_response.get(id(response))
+            if priority is None:
+                priority = by_response[id(response)] = len(self.intents)
+                self.intents.append((f"qualification:{getattr(response, 'id', keyword)}", response))
+            keywords.append((keyword, priority))
+
+        self.greeting = len(self.intents)
+        self.intents.append(("greeting", GREETING_RESPONSE))
+        for intent_id, response, words in [
+            ("enrolment", ENROLMENT_RESPONSE, ENROLMENT_KEYWORDS),
+            ("contact", CONTACT_RESPONSE, CONTACT_KEYWORDS),
+            ("qualifications", qualifications_response, QUALIFICATIONS_KEYWORDS),
+            ("assessment", ASSESSMENT_RESPONSE, ASSESSMENT_KEYWORDS),
+        ]:
+            priority = len(self.intents)
+            self.intents.append((intent_id, response))
+            keywords.extend((word, priority) for word in words)
+        self.automaton = KeywordAutomaton(keywords)
+
+        # ✅ Catalog fingerprint; the response cache is keyed on it
+        digest = hashlib.sha1()
+        for item in keywords + self.intents:
+            digest.update(repr(item).encode("utf-8"))
+        self.version = digest.hexdigest()
+
+    def _found(self, message):
+        found = self.automaton.find_all(message)
+        if message in GREETINGS:
+            found.add(self.greeting)
+        return found
+
+    def match(self, message):
+        """Return the intent ids found in a normalized message, best first."""
+        return [self.intents[p][0] for p in sorted(self._found(message))]
+
+    def respond(self, message):
+        """Return (intent_id, response_html) for a normalized message."""
+        found = self._found(message)
+        if not found:
+            return "fallback", FALLBACK_RESPONSE
+        intent_id, response = self.intents[min(found)]
+        return intent_id, _html(response)
+
+
+def _html(response):
+    # ✅ Catalog entries render (and memoize) their HTML on first use
+    return response if isinstance(response, str) else response.html
+
+
+# --------------------------
+# Shared LRU response cache (per process, across sessions)
+# --------------------------
+class ResponseCache:
+    """Bounded LRU of normalized message -> (intent_id, response_html).
+
+    Entries are tagged with the matcher's catalog version; a lookup under any
+    other version is a miss, so a catalog change can't serve stale HTML.
+    rewarm() moves the cache to a new version by recomputing the current keys,
+    so a catalog swap doesn't start from a cold cache.
+    """
+
+    def __init__(self, maxsize=1024, max_key_length=256):
+        self.maxsize = maxsize
+        self.max_key_length = max_key_length  # long free text is almost never repeated
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def get(self, version, key):
+        with self._lock:
+            value = self._data.get(key) if version == self._version else None
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._data.move_to_end(key)
+            return value
+
+    def put(self, version, key, value):
+        if self.maxsize <= 0 or len(key) > self.max_key_length:
+            return
+        with self._lock:
+            if version != self._version:
+                return
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def rewarm(self, version, compute):
+        """Switch to version, recomputing every cached key with compute(key) (LRU order kept)."""
+        with self._lock:
+            keys = list(self._data)
+        fresh = OrderedDict((key, compute(key)) for key in keys)
+        with self._lock:
+            if self._version is not None and self._version != version:
+                self.invalidations += 1
+            self._data = fresh
+            self._version = version
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+# ✅ CHATBOT_CACHE_SIZE=0 disables the response cache
+response_cache = ResponseCache(int(os.environ.get("CHATBOT_CACHE_SIZE", "1024")))
+matcher = None
+
+
+# --------------------------
+# Shared response table + compact chat records
+# --------------------------
+# Session histories store (role, body) pairs, not reply HTML: a bot turn's
+# body is a response id and the HTML lives once per process here. Ids stay
+# valid across catalog swaps (latest text wins). The ("Bot", id) pair itself
+# is one tuple per id shared by every session, so a bot turn costs a session
+# one list slot; user input (and error notes) is the only per-session text.
+response_table = {"welcome": WELCOME_RESPONSE, "fallback": FALLBACK_RESPONSE}
+bot_records = {}  # response id -> the shared ("Bot", id) history entry
+
+
+def _register_responses(new_matcher):
+    for intent_id, response in new_matcher.intents:
+        response_table[sys.intern(intent_id)] = response
+
+
+def response_html(response_id):
+    return _html(response_table.get(response_id, FALLBACK_RESPONSE))
+
+
+def user_message(text):
+    return ("You", text)
+
+
+def bot_message(response_id=None, text=None):
+    if response_id is None:
+        return ("Bot", text)
+    record = bot_records.get(response_id)
+    if record is None:
+        response_id = sys.intern(response_id)
+        record = bot_records.setdefault(response_id, ("Bot", response_id))
+    return record
+
+
+def message_body(message):
+    """HTML for a history entry; bodies that aren't response ids (user input, older (role, html)) are as stored."""
+    role, body = message
+    if role == "Bot" and body in response_table:
+        return response_html(body)
+    return body
+
+
+def set_catalog(responses, qualifications_response=None):
+    """Swap in a new keyword -> response catalog.
+
+    The response cache is rewarmed under the new catalog before the swap, so
+    popular messages stay cached across a reload.
+    """
+    global matcher, qualification_responses
+    if qualifications_response is None:
+        qualifications_response = matcher.qualifications_response
+    new_matcher = IntentMatcher(responses, qualifications_response)
+    _register_responses(new_matcher)
+    response_cache.rewarm(new_matcher.version, new_matcher.respond)
+    qualification_responses = responses
+    matcher = new_matcher
+
+
+# --------------------------
+# Catalog hot reload (qualifications.json mtime)
+# --------------------------
+CATALOG_CHECK_INTERVAL = float(os.environ.get("CHATBOT_CATALOG_CHECK", "2"))  # seconds; 0 = every message
+_reload_lock = threading.Lock()
+_catalog_checked = time.monotonic()
+_catalog_rejected = None  # mtime_ns of a file that failed to load (not retried until it changes)
+
+
+def reload_catalog(path=None):
+    """Reload the catalog file if its mtime changed. Returns True when a new catalog was swapped in."""
+    global _catalog, _catalog_rejected
+    path = path or catalog.CATALOG_PATH
+    load_catalog()
+    with _reload_lock:
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError as e:
+            log.error("catalog %s unavailable, keeping the loaded one: %s", path, e)
+            return False
+        if mtime_ns in (_catalog.mtime_ns, _catalog_rejected):
+            return False
+        try:
+            new_catalog = catalog.load(path)
+        except Exception as e:
+            _catalog_rejected = mtime_ns
+            log.error("catalog %s rejected, keeping the loaded one: %s", path, e)
+            return False
+        set_catalog(new_catalog.responses(), new_catalog)
+        _catalog = new_catalog
+        log.info("catalog reloaded: %d qualifications", len(new_catalog.entries))
+        return True
+
+
+def _check_catalog():
+    global _catalog_checked
+    now = time.monotonic()
+    if now - _catalog_checked < CATALOG_CHECK_INTERVAL:
+        return
+    _catalog_checked = now
+    if not _reload_lock.locked():
+        reload_catalog()
+
+
+def normalize_message(user_message: str) -> str:
+    return _PUNCTUATION.sub('', user_message.lower().strip())
+
+
+# --------------------------
+# Chatbot response function
+# --------------------------
+def respond(user_message: str):
+    """Return (intent_id, response_html), served from the shared cache when possible."""
+    try:
+        with metrics.timer("chat_turn_seconds"):
+            load_catalog()
+            _check_catalog()
+            message = normalize_message(user_message)
+            current = matcher
+            result = response_cache.get(current.version, message)
+            if result is None:
+                result = current.respond(message)
+                response_cache.put(current.version, message, result)
+    except Exception:
+        metrics.inc("chat_failures_total")
+        raise
+    metrics.inc("chat_turns_total")
+    metrics.inc("chat_intents_total", intent=result[0])
+    if result[0] == "fallback":
+        metrics.inc("chat_fallbacks_total")
+    return result
+
+
+def _cache_metrics():
+    stats = response_cache.stats()
+    return [
+        ("chat_response_cache_entries", "gauge", "Entries in the shared chatbot response cache.", {(): stats["size"]}),
+        ("chat_response_cache_lookups_total", "counter", "Response cache lookups by result.",
+         {(("result", "hit"),): stats["hits"], (("result", "miss"),): stats["misses"]}),
+        ("chat_response_cache_evictions_total", "counter", "Response cache entries dropped to stay under maxsize.",
+         {(): stats["evictions"]}),
+        ("chat_response_cache_invalidations_total", "counter",
+         "Catalog changes that moved the response cache to a new version (rewarmed).", {(): stats["invalidations"]}),
+    ]
+
+
+metrics.register_collector(_cache_metrics)
+
+
+def chatbot_response(user_message: str) -> str:
+    return respond(user_message)[1]
+
+
+def load_catalog():
+    """Load qualifications.json and build the intent matcher once per process; returns the matcher."""
+    global _catalog
+    if matcher is None:
+        with _reload_lock:
+            if matcher is None:
+                loaded = catalog.load()
+                set_catalog(loaded.responses(), loaded)
+                _catalog = loaded
+    return matcher
@@ -0,0 +1,99 @@
+# ---------------------------------------
+# 📱 DEVICE DETECTION (once per session)
+# ---------------------------------------
+# st_javascript("window.innerWidth") on every rerun meant a browser
+# round-trip per rerun, plus an extra rerun when the value came back. The
+# device is now classified once per session and kept in st.session_state:
+#   1. from the request's User-Agent header (no round-trip at all), and
+#   2. only if that is missing or DEVICE_PROBE=always, from a one-time
+#      browser probe (width + pixel ratio), given up after a few reruns.
+# Later reruns just read the cached dict.
+
+import json
+import os
+import re
+
+import streamlit as st
+from streamlit_javascript import st_javascript
+
+DEVICE_PROBE = os.environ.get("DEVICE_PROBE", "auto")  # auto | always | never
+PROBE_ATTEMPTS = 3  # reruns to wait for the browser before settling for the fallback
+PROBE_JS = "JSON.stringify({width: window.innerWidth, dpr: window.devicePixelRatio || 1})"
+
+DEFAULT_WIDTH = 768
+KIND_WIDTHS = {"mobile": 390, "tablet": 820, "desktop": 1280}
+
+_IN_APP = re.compile(r"FBAN|FBAV|FB_IAB|FBIOS|Messenger|Instagram|MicroMessenger|\bLine/|; wv\)")
+_TABLET = re.compile(r"iPad|Tablet|Android(?!.*Mobile)")
+_MOBILE = re.compile(r"Mobi|iPhone|iPod|Android|Windows Phone")
+
+
+def classify_user_agent(user_agent):
+    """Device dict guessed from a User-Agent string (source "ua"), or None if there is none."""
+    if not user_agent:
+        return None
+    if _TABLET.search(user_agent):
+        kind = "tablet"
+    elif _MOBILE.search(user_agent):
+        kind = "mobile"
+    else:
+        kind = "desktop"
+    return {
+        "kind": kind,
+        "width": KIND_WIDTHS[kind],
+        "dpr": 1.0 if kind == "desktop" else 2.0,
+        "in_app": bool(_IN_APP.search(user_agent)),
+        "source": "ua",
+    }
+
+
+def _user_agent():
+    try:
+        return st.context.headers.get("User-Agent")
+    except Exception:
+        return None
+
+
+def _kind_for_width(width):
+    if width < 768:
+        return "mobile"
+    return "tablet" if width < 1024 else "desktop"
+
+
+def _probe(device):
+    # ✅ Mounted only until the browser answers (or PROBE_ATTEMPTS reruns pass)
+    attempts = st.session_state.get("device_probe_attempts", 0) + 1
+    st.session_state.device_probe_attempts = attempts
+    raw = st_javascript(PROBE_JS, key="device_probe")
+    if raw:
+        try:
+            result = json.loads(raw)
+            width = int(result["width"])
+        except (TypeError, ValueError, KeyError):
+            attempts = PROBE_ATTEMPTS
+        else:
+            if width > 0:
+                device.update(width=width, dpr=float(result.get("dpr") or 1), source="client")
+                if device["kind"] == "unknown":
+                    device["kind"] = _kind_for_width(width)
+                attempts = PROBE_ATTEMPTS
+    if attempts >= PROBE_ATTEMPTS:
+        st.session_state.device_probe_done = True
+
+
+def detect_device():
+    """This session's device: kind, width (CSS px), dpr, in_app, source (ua / client / default)."""
+    device = st.session_state.get("device")
+    if device is None:
+        device = classify_user_agent(_user_agent()) or {
+            "kind": "unknown", "width": DEFAULT_WIDTH, "dpr": 1.0, "in_app": False, "source": "default",
+        }
+        st.session_state.device = device
+
+    if not st.session_state.get("device_probe_done"):
+        wanted = DEVICE_PROBE == "always" or (DEVICE_PROBE == "auto" and device["source"] == "default")
+        if wanted:
+            _probe(device)
+        else:
+            st.session_state.device_probe_done = True
+    return device
@@ -0,0 +1,274 @@
+# ---------------------------------------
+# 📈 STAGE TIMINGS + COUNTERS (Prometheus text format)
+# ---------------------------------------
+# Process-wide histograms and counters for the PDF pipeline and chat turns:
+#   pdf_stage_seconds{stage=plan|clone|overlay|flatten|compact|write|serve}
+#   pdf_render_seconds{engine}, pdf_renders_total{engine}, pdf_failures_total
+#   pdf_compact_stream_bytes_total{when=before|after} (after / before = compaction ratio),
+#   pdf_compact_stream_bytes_saved_total, pdf_compact_budget_exceeded_total
+#   pdf_template_cache_lookups_total{result}, pdf_template_cache_reloads_total,
+#   pdf_template_cache_entries (see pdf_fill.py)
+#   chat_turn_seconds, chat_turns_total, chat_intents_total{intent},
+#   chat_fallbacks_total, chat_failures_total
+#   pdf_job_seconds{outcome}, pdf_jobs_submitted_total, pdf_jobs_rejected_total{reason},
+#   pdf_jobs_inflight/queued/running (see pdf_jobs.py; renders in worker
+#   processes are recorded there with capture() and replay()ed here)
+#   app_run_seconds{scope=app|chat|buttons|form|pdf_poll}: full script runs
+#   and fragment-only reruns of app.py (count = reruns)
+#   app_sessions{state}, app_session_state_bytes{stat=total|max|p95},
+#   app_session_evictions_total, app_session_evicted_bytes_total (see session_memory.py)
+#   app_resource_load_seconds{resource}, app_resource_ready{resource} (see resources.py)
+# Exposed as Prometheus text from a file rewritten every METRICS_INTERVAL
+# seconds (METRICS_FILE, e.g. for node_exporter's textfile collector) and/or
+# an HTTP endpoint (METRICS_PORT, serves /metrics on METRICS_ADDR).
+# APP_METRICS=0 turns collection off: timer() hands back a shared no-op and
+# inc()/observe() return on the first line.
+
+import bisect
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+log = logging.getLogger(__name__)
+
+ENABLED = os.environ.get("APP_METRICS", "1") != "0"
+METRICS_FILE = os.environ.get("METRICS_FILE")
+METRICS_PORT = os.environ.get("METRICS_PORT")
+METRICS_ADDR = os.environ.get("METRICS_ADDR", "127.0.0.1")
+METRICS_INTERVAL = float(os.environ.get("METRICS_INTERVAL", "15"))
+
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+HELP = {
+    "pdf_stage_seconds": "Time spent in each stage of filling a registration PDF.",
+    "pdf_render_seconds": "End-to-end time to fill, flatten and serialize a registration PDF.",
+    "pdf_renders_total": "Registration PDFs rendered.",
+    "pdf_failures_total": "Registration PDF renders that raised.",
+    "pdf_compact_stream_bytes_saved_total": "Stream bytes removed by per-request compaction.",
+    "pdf_compact_stream_bytes_total": "Content stream bytes per-request compaction looked at, before and after.",
+    "pdf_compact_budget_exceeded_total": "Renders whose compaction stopped at PDF_COMPACT_BUDGET_MS.",
+    "app_run_seconds": "Script time of full app.py runs (scope=app) and of fragment-only reruns.",
+    "chat_turn_seconds": "Time to produce a chatbot reply.",
+    "chat_turns_total": "Chat turns answered.",
+    "chat_intents_total": "Chat turns by matched intent.",
+    "chat_fallbacks_total": "Chat turns that matched no intent.",
+    "chat_failures_total": "Chat turns that raised.",
+}
+
+_lock = threading.Lock()
+_histograms = {}  # name -> {labels: [bucket counts..., sum, count]}
+_counters = {}    # name -> {labels: value}
+_collectors = []  # callables returning [(name, type, help, {labels: value})]
+_exporters_started = False
+_local = threading.local()  # .captured: list while capture() is active on this thread
+
+
+def _key(labels):
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def observe(name, seconds, **labels):
+    if not ENABLED:
+        return
+    captured = getattr(_local, "captured", None)
+    if captured is not None:
+        captured.append(("observe", name, seconds, labels))
+        return
+    index = bisect.bisect_left(BUCKETS, seconds)
+    key = _key(labels)
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        row = series.get(key)
+        if row is None:
+            row = series[key] = [0] * (len(BUCKETS) + 2) + [0.0]
+        row[index] += 1  # index len(BUCKETS) = +Inf only
+        row[-2] += 1
+        row[-1] += seconds
+
+
+def inc(name, amount=1, **labels):
+    if not ENABLED:
+        return
+    captured = getattr(_local, "captured", None)
+    if captured is not None:
+        captured.append(("inc", name, amount, labels))
+        return
+    key = _key(labels)
+    with _lock:
+        series = _counters.setdefault(name, {})
+        series[key] = series.get(key, 0) + amount
+
+
+class _Timer:
+    __slots__ = ("name", "labels", "start")
+
+    def __init__(self, name, labels):
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.name, time.perf_counter() - self.start, **self.labels)
+        return False
+
+    def relabel(self, **labels):
+        # ✅ For labels only known once the timed work is under way
+        self.labels.update(labels)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def relabel(self, **labels):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name, **labels):
+    """with timer("pdf_stage_seconds", stage="write"): ..."""
+    return _Timer(name, labels) if ENABLED else _NULL_TIMER
+
+
+@contextmanager
+def capture():
+    """with capture() as records: divert this thread's observe()/inc() calls into records.
+
+    For work done in another process (pdf_jobs workers): ship records back and replay() them.
+    """
+    previous = getattr(_local, "captured", None)
+    _local.captured = records = []
+    try:
+        yield records
+    finally:
+        _local.captured = previous
+
+
+def replay(records):
+    for kind, name, value, labels in records or ():
+        (observe if kind == "observe" else inc)(name, value, **labels)
+
+
+def register_collector(fn):
+    """fn() -> [(name, "gauge" | "counter", help, {labels_tuple: value})], read at export time."""
+    _collectors.append(fn)
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+# --------------------------
+# Prometheus text exposition
+# --------------------------
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(key, extra=None):
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    with _lock:
+        histograms = {name: {k: list(row) for k, row in series.items()} for name, series in _histograms.items()}
+        counters = {name: dict(series) for name, series in _counters.items()}
+    lines = []
+    for name in sorted(histograms):
+        lines += [f"# HELP {name} {HELP.get(name, name)}", f"# TYPE {name} histogram"]
+        for key, row in sorted(histograms[name].items()):
+            cumulative = 0
+            for bound, count in zip(BUCKETS, row):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(key, ('le', repr(bound)))} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(key, ('le', '+Inf'))} {row[-2]}")
+            lines.append(f"{name}_sum{_labels(key)} {_number(row[-1])}")
+            lines.append(f"{name}_count{_labels(key)} {row[-2]}")
+    for name in sorted(counters):
+        lines += [f"# HELP {name} {HELP.get(name, name)}", f"# TYPE {name} counter"]
+        for key, value in sorted(counters[name].items()):
+            lines.append(f"{name}{_labels(key)} {_number(value)}")
+    for collect in _collectors:
+        try:
+            families = collect()
+        except Exception as e:
+            log.error("metrics collector %r failed: %s", collect, e)
+            continue
+        for name, kind, help_text, samples in families:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for key, value in sorted(samples.items()):
+                lines.append(f"{name}{_labels(key)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+
+def write_file(path=None):
+    # ✅ Write to a temp name and rename, so a scraper never reads half a file
+    path = path or METRICS_FILE
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_exporters():
+    """Start the file writer / HTTP endpoint configured by env (once per process)."""
+    global _exporters_started
+    with _lock:
+        if _exporters_started or not ENABLED:
+            return
+        _exporters_started = True
+    if METRICS_FILE:
+        def loop():
+            while True:
+                try:
+                    write_file()
+                except OSError as e:
+                    log.error("metrics file %s not written: %s", METRICS_FILE, e)
+                time.sleep(METRICS_INTERVAL)
+        threading.Thread(target=loop, name="metrics-file", daemon=True).start()
+    if METRICS_PORT:
+        server = ThreadingHTTPServer((METRICS_ADDR, int(METRICS_PORT)), _Handler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+        log.info("metrics at http://%s:%s/metrics", METRICS_ADDR, METRICS_PORT)
+
+
+if __name__ == "__main__":
+    print(render(), end="")
@@ -0,0 +1,122 @@
+# ---------------------------------------
+# 🧾 GENERATED PDF CACHE (content-addressed)
+# ---------------------------------------
+# Pressing "Generate PDF" twice, or re-submitting the same answers after the
+# form closes, used to run the whole fill + flatten pipeline again. Finished
+# PDFs are kept by sha256(canonical form data + template hash + engine +
+# output mode + compaction), so an identical submit is served from memory. Entries expire after
+# PDF_CACHE_TTL seconds (they hold personal data, so not for long) and the
+# total is capped at PDF_CACHE_MAX_MB, evicting least recently used first.
+# Concurrent identical submits are coalesced in pdf_jobs.submit().
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+import pdf_compact
+import pdf_fill
+from pdf_incremental import owned_size
+
+CACHE_TTL = float(os.environ.get("PDF_CACHE_TTL", "600"))
+CACHE_MAX_BYTES = int(float(os.environ.get("PDF_CACHE_MAX_MB", "32")) * 1024 * 1024)
+
+
+def cache_key(data, template_path=None, engine=None, output=None, compact=None):
+    """sha256 of the canonical form data + template content + every setting that changes the bytes."""
+    canonical = json.dumps(data, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    digest = hashlib.sha256(canonical.encode("utf-8"))
+    digest.update(pdf_fill.template_version(template_path).encode("ascii"))
+    digest.update((engine or pdf_fill.OVERLAY_ENGINE).encode("ascii"))
+    digest.update((output or pdf_fill.OUTPUT_MODE).encode("ascii"))
+    digest.update(b"compact" if (pdf_compact.COMPACT if compact is None else compact) else b"plain")
+    return digest.hexdigest()
+
+
+class PdfCache:
+    """LRU of cache key -> PDF bytes, bounded by total bytes, entries expire after ttl seconds."""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, ttl=CACHE_TTL):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires, pdf_bytes)
+        self._lock = threading.Lock()
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = self.expirations = 0
+
+    def _drop(self, key):
+        _, pdf = self._data.pop(key)
+        self.bytes -= owned_size(pdf)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, pdf):
+        # ✅ pdf may be an IncrementalPdf; only its update counts (the template bytes are shared)
+        if owned_size(pdf) > self.max_bytes or self.ttl <= 0:
+            return
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+            self._data[key] = (time.monotonic() + self.ttl, pdf)
+            self.bytes += owned_size(pdf)
+            # ✅ Expired entries go first, then least recently used
+            now = time.monotonic()
+            for old in [k for k, (expires, _) in self._data.items() if expires <= now]:
+                self._drop(old)
+                self.expirations += 1
+            while self.bytes > self.max_bytes:
+                self._drop(next(iter(self._data)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.bytes = 0
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._data),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+# ✅ PDF_CACHE_MAX_MB=0 (or PDF_CACHE_TTL=0) disables the cache
+pdf_cache = PdfCache()
+
+
+def _cache_metrics():
+    s = pdf_cache.stats()
+    return [
+        ("pdf_cache_entries", "gauge", "Generated PDFs held in the cache.", {(): s["entries"]}),
+        ("pdf_cache_bytes", "gauge", "Bytes of generated PDFs held in the cache.", {(): s["bytes"]}),
+        ("pdf_cache_hits_total", "counter", "Submits served from the PDF cache.", {(): s["hits"]}),
+        ("pdf_cache_misses_total", "counter", "Submits not found in the PDF cache.", {(): s["misses"]}),
+        ("pdf_cache_evictions_total", "counter", "PDFs evicted to stay under the byte cap.", {(): s["evictions"]}),
+        ("pdf_cache_expirations_total", "counter", "PDFs dropped after their TTL.", {(): s["expirations"]}),
+    ]
+
+
+metrics.register_collector(_cache_metrics)
@@ -0,0 +1,261 @@
+# ---------------------------------------
+# 🗜️ OUTPUT COMPACTION (before the filled PDF is serialized)
+# ---------------------------------------
+# pdfrw writes every object reachable from the trailer, as-is. A flattened
+# form used to still carry its 55 widgets (kept alive by /AcroForm /Fields
+# and the tagged-PDF structure tree) with their appearance streams and
+# fonts, plus uncompressed overlay/metadata streams.
+#
+# Template work, done once when the template is loaded (see pdf_fill):
+#   - compress_streams(master, in_place=True): Flate the template's
+#     unfiltered streams (e.g. the XMP metadata)
+#   - compact_tree(flat copy): after the widgets are removed and
+#     prune_form() unlinks them, identical streams / fonts are merged and
+#     the flat copy is what flattened overlay renders start from
+# Per request, compact() only has the new objects left to look at:
+#   1. prune  - a native fill flattened from the full template still needs
+#               its widgets unlinked (prune_form)
+#   2. flate  - unfiltered page content streams are Flate-compressed, and
+#               identical ones (one overlay reused on two pages) are merged
+# Objects shared across requests (template streams, the overlay font,
+# native appearances) are never modified: compact() swaps references in the
+# document's own page dicts. Each step leaves a valid document, so when
+# PDF_COMPACT_BUDGET_MS runs out the rest is skipped and the PDF is written
+# as it stands. The deadline is checked per structure element while pruning
+# and per content stream while compressing, not just between pages.
+
+import os
+import time
+import zlib
+
+from pdfrw import PdfDict, PdfArray, PdfName
+
+COMPACT = os.environ.get("PDF_COMPACT", "1") != "0"
+BUDGET_MS = float(os.environ.get("PDF_COMPACT_BUDGET_MS", "5"))
+MIN_STREAM = 64  # smaller streams don't shrink under Flate
+DEDUPE_TYPES = {PdfName.Font, PdfName.FontDescriptor, PdfName.ExtGState}
+
+_K, _OBJR, _OBJ, _TYPE = PdfName.K, PdfName.OBJR, PdfName.Obj, PdfName.Type
+_NUMS, _KIDS, _LIMITS = PdfName.Nums, PdfName.Kids, PdfName.Limits
+_CONTENTS = PdfName.Contents
+
+
+class _OutOfTime(Exception):
+    pass
+
+
+def _check(deadline):
+    if deadline is not None and time.perf_counter() > deadline:
+        raise _OutOfTime
+
+# ---------------------------------------
+# Prune what flatten() left behind
+# ---------------------------------------
+def _prune_struct(element, dropped, deadline=None):
+    # ✅ Remove OBJR kids pointing at dropped widgets; True if element is left empty.
+    #    An element is rewritten only after all its kids are done, so stopping
+    #    at the deadline leaves every element either pruned or untouched.
+    kids = dict.get(element, _K)
+    if kids is None:
+        return False
+    single = not isinstance(kids, PdfArray)
+    kept = []
+    pruned = False
+    for kid in ((kids,) if single else list.__iter__(kids)):
+        _check(deadline)
+        if isinstance(kid, PdfDict):
+            if dict.get(kid, _TYPE) == _OBJR:
+                if id(dict.get(kid, _OBJ)) in dropped:
+                    pruned = True
+                    continue
+            elif _prune_struct(kid, dropped, deadline):
+                pruned = True
+                continue
+        kept.append(kid)
+    if not pruned:
+        return False
+    if not kept:
+        return True
+    dict.__setitem__(element, _K, kept[0] if single else PdfArray(kept))
+    return False
+
+
+def _prune_number_tree(node, keys, deadline=None):
+    _check(deadline)
+    nums = dict.get(node, _NUMS)
+    if nums is not None:
+        pairs = [(nums[i], nums[i + 1]) for i in range(0, len(nums) - 1, 2) if int(nums[i]) not in keys]
+        dict.__setitem__(node, _NUMS, PdfArray([item for pair in pairs for item in pair]))
+        if dict.get(node, _LIMITS) is not None and pairs:
+            dict.__setitem__(node, _LIMITS, PdfArray([pairs[0][0], pairs[-1][0]]))
+    for kid in dict.get(node, _KIDS) or ():
+        _prune_number_tree(kid, keys, deadline)
+
+
+def prune_form(trailer, dropped_annots, deadline=None):
+    """Unlink the widgets flatten() took off the pages, so they aren't written.
+
+    Returns False if it stopped at deadline (a time.perf_counter() value); the
+    widgets still linked from the structure tree are then written as before.
+    """
+    if not dropped_annots:
+        return True
+    dropped = {id(a) for a in dropped_annots}
+    trailer.Root.AcroForm = None
+    struct = trailer.Root.StructTreeRoot
+    if struct is not None:
+        try:
+            if _prune_struct(struct, dropped, deadline):
+                struct.K = PdfArray()
+            keys = {int(a.StructParent) for a in dropped_annots if a.StructParent is not None}
+            if keys and struct.ParentTree is not None:
+                _prune_number_tree(struct.ParentTree, keys, deadline)
+        except _OutOfTime:
+            return False
+    return True
+
+
+# ---------------------------------------
+# Flate + dedupe
+# ---------------------------------------
+def _flated(obj):
+    # ✅ A compressed copy of an unfiltered stream, or None if it wouldn't shrink
+    data = obj.stream
+    if data is None or obj.Filter is not None or len(data) < MIN_STREAM:
+        return None
+    packed = zlib.compress(data.encode("latin-1"), 6).decode("latin-1")
+    if len(packed) + 20 >= len(data):  # + "/Filter /FlateDecode"
+        return None
+    new = PdfDict()
+    for key, value in dict.items(obj):
+        if key != PdfName.Length:
+            dict.__setitem__(new, key, value)
+    new.indirect = True
+    new.Filter = PdfName.FlateDecode
+    new.stream = packed
+    return new
+
+
+def _value_key(value, replaced):
+    if isinstance(value, (PdfDict, PdfArray)):
+        if getattr(value, "indirect", False):
+            return ("ref", id(replaced.get(id(value), value)))
+        if isinstance(value, PdfDict):
+            return ("dict",) + tuple(sorted((k, _value_key(v, replaced)) for k, v in dict.items(value)))
+        return ("array",) + tuple(_value_key(v, replaced) for v in list.__iter__(value))
+    return value
+
+
+def _dedupe_key(obj, replaced):
+    if not obj.indirect or (obj.stream is None and dict.get(obj, _TYPE) not in DEDUPE_TYPES):
+        return None
+    items = tuple(sorted((k, _value_key(v, replaced)) for k, v in dict.items(obj) if k != PdfName.Length))
+    return (obj.stream, items)
+
+
+def _walk(trailer, dedupe, in_place):
+    # ✅ Post-order, so children are merged / compressed before their parents are keyed
+    stats = {"deduped": 0, "compressed": 0, "stream_bytes_saved": 0}
+    replaced = {}   # id(original) -> replacement
+    canonical = {}  # dedupe key -> first object seen
+    seen = {id(trailer)}
+    stack = [(trailer, False)]
+    while stack:
+        obj, done = stack.pop()
+        if not done:
+            stack.append((obj, True))
+            children = dict.values(obj) if isinstance(obj, PdfDict) else list.__iter__(obj)
+            for child in children:
+                if isinstance(child, (PdfDict, PdfArray)) and id(child) not in seen:
+                    seen.add(id(child))
+                    stack.append((child, False))
+            continue
+        if replaced:
+            if isinstance(obj, PdfDict):
+                for key, value in list(dict.items(obj)):
+                    new = replaced.get(id(value))
+                    if new is not None:
+                        dict.__setitem__(obj, key, new)
+            else:
+                for i, value in enumerate(list.__iter__(obj)):
+                    new = replaced.get(id(value))
+                    if new is not None:
+                        list.__setitem__(obj, i, new)
+        if not isinstance(obj, PdfDict) or obj is trailer:
+            continue
+        if dedupe:
+            key = _dedupe_key(obj, replaced)
+            if key is not None:
+                first = canonical.setdefault(key, obj)
+                if first is not obj:
+                    replaced[id(obj)] = first
+                    stats["deduped"] += 1
+                    stats["stream_bytes_saved"] += len(obj.stream or "")
+                    continue
+        new = _flated(obj)
+        if new is not None:
+            stats["compressed"] += 1
+            stats["stream_bytes_saved"] += len(obj.stream) - len(new.stream)
+            if in_place:
+                dict.clear(obj)
+                dict.update(obj, dict.items(new))
+                vars(obj)["stream"] = new.stream
+            else:
+                replaced[id(obj)] = new
+    return stats
+
+
+def compress_streams(trailer, in_place=False):
+    """Flate every unfiltered stream (in_place only for a tree nobody else holds yet)."""
+    return _walk(trailer, dedupe=False, in_place=in_place)
+
+
+def compact_tree(trailer):
+    """Merge identical streams / fonts and Flate the rest, rewriting a private tree in place."""
+    return _walk(trailer, dedupe=True, in_place=False)
+
+
+def compact(trailer, pages, dropped_annots=None, budget_ms=None):
+    """Per-request compaction of a filled document; returns stats (see module comment)."""
+    start = time.perf_counter()
+    deadline = start + (BUDGET_MS if budget_ms is None else budget_ms) / 1000.0
+    stats = {"pruned_widgets": 0, "compressed": 0, "deduped": 0, "stream_bytes_in": 0, "stream_bytes_saved": 0,
+             "complete": True}
+    if dropped_annots:
+        if prune_form(trailer, dropped_annots, deadline):
+            stats["pruned_widgets"] = len(dropped_annots)
+        else:
+            stats["complete"] = False
+
+    merged = {}  # stream data -> compacted stream
+    for page in pages:
+        if not stats["complete"]:
+            break
+        contents = dict.get(page, _CONTENTS)
+        streams = list.__iter__(contents) if isinstance(contents, PdfArray) else (contents,)
+        swapped = []
+        for stream in streams:
+            if stats["complete"] and time.perf_counter() > deadline:
+                stats["complete"] = False  # ✅ the rest of this page's streams stay as they are
+            if (stats["complete"] and isinstance(stream, PdfDict) and stream.stream is not None
+                    and stream.Filter is None):
+                stats["stream_bytes_in"] += len(stream.stream)
+                new = merged.get(stream.stream)
+                if new is not None:
+                    stats["deduped"] += 1
+                    stats["stream_bytes_saved"] += len(stream.stream)
+                else:
+                    new = _flated(stream)
+                    if new is not None:
+                        stats["compressed"] += 1
+                        stats["stream_bytes_saved"] += len(stream.stream) - len(new.stream)
+                        merged[stream.stream] = new
+                swapped.append(new or stream)
+            else:
+                swapped.append(stream)
+        if isinstance(contents, PdfArray):
+            dict.__setitem__(page, _CONTENTS, PdfArray(swapped))
+        elif contents is not None:
+            dict.__setitem__(page, _CONTENTS, swapped[0])
+    stats["ms"] = (time.perf_counter() - start) * 1000
+    return stats
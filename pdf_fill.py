@@ -0,0 +1,541 @@
+# 📄 PDF Handling (pdfrw)
+import hashlib
+import os
+import threading
+from io import BytesIO
+
+from pdfrw import PdfReader, PdfWriter, PdfDict, PdfName, PdfArray, PdfObject
+
+# 🖋️ PDF Drawing (ReportLab)
+from reportlab.pdfgen import canvas
+from reportlab.lib.pagesizes import letter
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+
+import metrics
+import pdf_compact
+import pdf_incremental
+import pdf_native
+import pdf_overlay
+
+
+# ---------------------------------------
+# 🗃️ PARSED TEMPLATE CACHE (process-wide)
+# ---------------------------------------
+# The template is parsed once per process and kept as a fully resolved,
+# read-only object graph. Every request gets its own structural clone
+# (new dicts/arrays, shared immutable stream data), so fills never touch
+# the cached master. The entry is reloaded when the file's mtime changes.
+
+_template_cache = {}
+_template_lock = threading.Lock()
+_template_stats = {"hits": 0, "misses": 0, "reloads": 0}
+
+
+def _resolve_all(trailer):
+    # ✅ Force every lazy PdfIndirect to load so the master never mutates on read
+    seen = set()
+    stack = [trailer]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if isinstance(obj, PdfDict):
+            stack.extend(obj.itervalues())
+        elif isinstance(obj, PdfArray):
+            stack.extend(obj)
+
+
+# ✅ What a fill can change: the page tree, each page's resources and widget
+#    annotations, and the form dictionary. Incremental output clones only these.
+SKELETON_KEYS = frozenset(PdfName(k) for k in ("Root", "Pages", "Kids", "AcroForm", "Resources", "Font",
+                                               "XObject", "Annots"))
+
+
+def _clone(root, memo=None, keys=None):
+    # ✅ Copy containers only; strings, names and stream bodies are immutable
+    #    (memo, if given, is filled with id(original) -> copy). With keys, only
+    #    containers reached through those keys (and array items) are copied;
+    #    everything else stays shared with root and must not be mutated.
+    memo = {} if memo is None else memo
+    stack = []
+
+    def shell(obj):
+        new = memo.get(id(obj))
+        if new is not None:
+            return new
+        if isinstance(obj, PdfDict):
+            new = PdfDict()
+            vars(new)["indirect"] = obj.indirect
+            vars(new)["stream"] = obj.stream
+        elif isinstance(obj, PdfArray):
+            new = PdfArray()
+        else:
+            return obj
+        memo[id(obj)] = new
+        stack.append((obj, new))
+        return new
+
+    result = shell(root)
+    while stack:
+        obj, new = stack.pop()
+        if isinstance(obj, PdfDict):
+            for key, value in dict.items(obj):
+                dict.__setitem__(new, key, shell(value) if keys is None or key in keys else value)
+        else:
+            list.extend(new, [shell(value) for value in list.__iter__(obj)])
+    return result
+
+
+def _flat_master(master):
+    # ✅ The template as every flattened overlay render ends up: no widgets, no
+    #    /AcroForm, structure tree unlinked from the widgets, duplicates merged
+    flat = _clone(master)
+    dropped = []
+    for page in template_pages(flat):
+        if PdfName("Annots") in page:
+            dropped.extend(page.Annots)
+            del page[PdfName("Annots")]
+    pdf_compact.prune_form(flat, dropped)
+    pdf_compact.compact_tree(flat)
+    return flat
+
+
+def _template_entry(input_pdf_path):
+    # ✅ (master, fill plan, flat master) for the current version of the file
+    mtime = os.stat(input_pdf_path).st_mtime_ns
+    with _template_lock:
+        entry = _template_cache.get(input_pdf_path)
+        if entry is not None and entry[0] == mtime:
+            _template_stats["hits"] += 1
+            metrics.inc("pdf_template_cache_lookups_total", result="hit")
+        else:
+            _template_stats["misses"] += 1
+            metrics.inc("pdf_template_cache_lookups_total", result="miss")
+            if entry is not None:
+                _template_stats["reloads"] += 1
+                metrics.inc("pdf_template_cache_reloads_total")
+            with open(input_pdf_path, "rb") as f:
+                data = f.read()
+            reader = PdfReader(fdata=data)
+            master = PdfDict(reader)
+            _resolve_all(master)
+            try:
+                master.private.source = pdf_incremental.TemplateSource(data, reader)
+            except ValueError:
+                master.private.source = None  # incremental output falls back to a full rewrite
+            pdf_compact.compress_streams(master, in_place=True)  # ✅ once, not per request
+            entry = (mtime, master, compile_fill_plan(master), _flat_master(master))
+            _template_cache[input_pdf_path] = entry
+    return entry[1], entry[2], entry[3]
+
+
+def load_template(input_pdf_path):
+    """Return a private, writable copy of the parsed template."""
+    master = _template_entry(input_pdf_path)[0]
+    return _clone(master)
+
+
+def fill_plan(input_pdf_path=None):
+    # ✅ Compiled fill plan for the current version of the template
+    return _template_entry(input_pdf_path or TEMPLATE_PATH)[1]
+
+
+def warm_template(input_pdf_path=None):
+    # ✅ Parse/compile the template and build the overlay font ahead of the first request
+    _template_entry(input_pdf_path or TEMPLATE_PATH)
+    pdf_overlay.overlay_font()
+
+
+_template_digests = {}  # path -> (mtime_ns, sha256 hex)
+
+
+def template_version(input_pdf_path=None):
+    # ✅ Content hash of the template file, re-hashed only when its mtime changes
+    input_pdf_path = input_pdf_path or TEMPLATE_PATH
+    mtime = os.stat(input_pdf_path).st_mtime_ns
+    with _template_lock:
+        entry = _template_digests.get(input_pdf_path)
+    if entry is None or entry[0] != mtime:
+        with open(input_pdf_path, "rb") as f:
+            entry = (mtime, hashlib.sha256(f.read()).hexdigest())
+        with _template_lock:
+            _template_digests[input_pdf_path] = entry
+    return entry[1]
+
+
+def template_cache_stats():
+    with _template_lock:
+        stats = dict(_template_stats)
+        stats["entries"] = len(_template_cache)
+    return stats
+
+
+def _template_cache_metrics():
+    stats = template_cache_stats()
+    return [
+        ("pdf_template_cache_entries", "gauge", "Parsed templates cached in this process.", {(): stats["entries"]}),
+    ]
+
+
+metrics.register_collector(_template_cache_metrics)
+metrics.HELP.update({
+    # ✅ Counted with inc(), so lookups in pdf_jobs workers come back with their renders
+    "pdf_template_cache_lookups_total": "Parsed-template cache lookups by result.",
+    "pdf_template_cache_reloads_total": "Templates re-parsed because the file changed.",
+})
+
+
+def template_pages(trailer):
+    # ✅ Pages in document order (the cached master is a plain PdfDict, not a PdfReader)
+    result = []
+    stack = [trailer.Root.Pages]
+    while stack:
+        node = stack.pop()
+        if node.Type == PdfName.Pages:
+            stack.extend(reversed(node.Kids))
+        else:
+            result.append(node)
+    return result
+
+
+# ---------------------------------------
+# 🧭 FIELD FILL PLAN (compiled once per template)
+# ---------------------------------------
+# ✅ MAPPING gender, status, employment: data key -> form value -> widget name
+CHECKBOX_GROUPS = {
+    "Sex": {
+        "Male": "sex_male",
+        "Female": "sex_female"
+    },
+    "CivilStatus": {
+        "Single": "civilstatus_single",
+        "Married": "civilstatus_married",
+        "Divorced": "civilstatus_divorce",
+        "Widowed": "civilstatus_widow",
+        "Live-in": "civilstatus_livein"
+    },
+    "EmploymentStatus": {
+        "Unemployed": "empstatus_unemp",
+        "Wage Employed": "empstatus_wage",
+        "Underemployed": "empstatus_under",
+        "Self-Employed": "empstatus_self"
+    },
+    "EmploymentType": {
+        "None": "emptype_none",
+        "Casual": "emptype_casual",
+        "Probationary": "emptype_probationary",
+        "Contractual": "emptype_contractual",
+        "Regular": "emptype_regular",
+        "Job Order": "emptype_joborder",
+        "Permanent": "emptype_permanent",
+        "Temporary": "emptype_temporary"
+    },
+}
+
+CHECK_FONT_SIZE = 12
+TEXT_FONT_SIZE = 10
+
+
+def _widget_name(t):
+    return t.to_unicode().strip("()") if hasattr(t, "to_unicode") else t[1:-1]
+
+
+def compile_fill_plan(trailer):
+    """Precompute where every fillable value is drawn.
+
+    Returns {"checks": {data key: {value: [op]}}, "texts": {widget: [op]}}
+    where op is (page_index, annot_order, kind, x, y, width, height).
+    """
+    widget_groups = {
+        widget: (data_key, value)
+        for data_key, choices in CHECKBOX_GROUPS.items()
+        for value, widget in choices.items()
+    }
+    checks = {}
+    texts = {}
+    for page_index, page in enumerate(template_pages(trailer)):
+        for order, a in enumerate(page.Annots or ()):
+            if a.Subtype != PdfName.Widget or not a.T or not a.Rect:
+                continue
+            key = _widget_name(a.T)
+            x1, y1, x2, y2 = (float(v) for v in a.Rect)
+            x, y, w, h = min(x1, x2), min(y1, y2), abs(x2 - x1), abs(y2 - y1)
+            group = widget_groups.get(key)
+            if group is not None:
+                data_key, value = group
+                ops = checks.setdefault(data_key, {}).setdefault(value, [])
+                ops.append((page_index, order, "check", x, y, w, h))
+            else:
+                texts.setdefault(key, []).append((page_index, order, "text", x, y, w, h))
+    return {"checks": checks, "texts": texts}
+
+
+def plan_page_ops(plan, data_dict):
+    """Resolve the plan against one registrant: {page_index: [(kind, x, y, text)]}."""
+    pending = {}
+    for data_key, choices in plan["checks"].items():
+        for page_index, order, kind, x, y, _, _ in choices.get(data_dict.get(data_key), ()):
+            pending.setdefault(page_index, []).append((order, kind, x, y, "X"))
+    texts = plan["texts"]
+    for key, value in data_dict.items():
+        for page_index, order, kind, x, y, _, _ in texts.get(key, ()):
+            pending.setdefault(page_index, []).append((order, kind, x, y, str(value)))
+
+    # ✅ Keep the template's annotation order so output matches a full scan
+    page_ops = {}
+    for page_index, ops in pending.items():
+        ops.sort(key=lambda op: op[0])
+        page_ops[page_index] = [op[1:] for op in ops]
+    return page_ops
+
+
+# ---------------------------------------
+# 🔧 PDF FILLING FUNCTIONS
+# ---------------------------------------
+TEMPLATE_PATH = "tesdabit_regform.pdf"
+
+# ✅ "direct" writes text operators straight into a content stream (see pdf_overlay);
+#    "reportlab" draws on a canvas and re-parses it; "native" sets the form fields'
+#    own values and appearance streams instead of overlaying (see pdf_native).
+#    Direct and native fall back to ReportLab for text outside cp1252.
+OVERLAY_ENGINE = os.environ.get("PDF_FILL_ENGINE", "direct")
+# ✅ "rewrite" serializes the whole filled document; "incremental" appends
+#    only the changes to the template's original bytes (pdf_incremental)
+OUTPUT_MODE = os.environ.get("PDF_OUTPUT", "rewrite")
+
+
+def register_fonts():
+    # ✅ Idempotent; resources.bootstrap() calls it once, batch/bench callers may not have
+    if "DejaVuSans" not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont("DejaVuSans", pdf_overlay.FONT_PATH))
+
+
+def reportlab_form(ops):
+    """Draw (kind, x, y, text) ops with ReportLab; returns a form XObject (any Unicode text)."""
+    register_fonts()
+    # Create overlay canvas for this page
+    packet = BytesIO()
+    can = canvas.Canvas(packet, pagesize=letter)
+    for kind, x, y, text in ops:
+        if kind == "check":
+            # ✅ Checkbox Mark X
+            can.setFont("DejaVuSans", CHECK_FONT_SIZE)
+            can.drawString(x + 1, y + 1, text)
+        else:
+            # ✅ Regular text field
+            can.setFont("DejaVuSans", TEXT_FONT_SIZE)
+            can.drawString(x + 2, y + 2, text)
+    can.save()
+    packet.seek(0)
+
+    # ✅ Wrap the overlay page in a form XObject so it keeps its own /Resources:
+    #    its font names (/F1, /F2+0) would otherwise miss or clash with the template's
+    overlay_pdf = PdfReader(packet)
+    if not overlay_pdf.pages:
+        return None
+    overlay_page = overlay_pdf.pages[0]
+    form = PdfDict(Type=PdfName.XObject, Subtype=PdfName.Form,
+                   BBox=overlay_page.MediaBox, Resources=overlay_page.Resources)
+    form.indirect = True
+    form.stream = overlay_page.Contents.stream
+    if overlay_page.Contents.Filter is not None:
+        form.Filter = overlay_page.Contents.Filter
+    return form
+
+
+def draw_form(name):
+    # ✅ Content stream that paints the form XObject registered as /name
+    contents = PdfDict()
+    contents.indirect = True
+    contents.stream = "q /%s Do Q" % name
+    return contents
+
+
+def _reportlab_overlay(page, ops, name):
+    form = reportlab_form(ops)
+    if form is None:
+        return None
+    resources = page.Resources
+    if resources is None:
+        resources = page.Resources = PdfDict()
+    xobjects = resources.XObject
+    if xobjects is None:
+        xobjects = resources.XObject = PdfDict()
+    xobjects[PdfName(name)] = form
+    return draw_form(name)
+
+
+def _append_contents(page, contents):
+    if page.Contents:
+        page.Contents = PdfArray([page.Contents, contents])
+    else:
+        page.Contents = contents
+
+
+def fill_template(input_pdf_path, data_dict, engine=None, flat=False, incremental=False):
+    """Fill a private copy of the template and return it (not yet serialized).
+
+    flat=True (overlay engines) starts from the pre-flattened template, so the
+    result is already free of widgets; flatten() is then a no-op.
+    incremental=True copies only the parts a fill can change (SKELETON_KEYS)
+    and remembers what they were cloned from, for _incremental_update().
+    """
+    master, plan, flat_master = _template_entry(input_pdf_path)
+    with metrics.timer("pdf_stage_seconds", stage="plan"):
+        page_ops = plan_page_ops(plan, data_dict)
+    engine = engine or OVERLAY_ENGINE
+    if engine in ("direct", "native") and not pdf_overlay.can_encode(page_ops):
+        engine = "reportlab"
+    metrics.inc("pdf_renders_total", engine=engine)
+
+    with metrics.timer("pdf_stage_seconds", stage="clone"):
+        if incremental and master.source is not None:
+            memo = {}
+            template_pdf = _clone(master, memo, SKELETON_KEYS)
+            template_pdf.private.clone_memo = memo
+            template_pdf.private.source = master.source
+        elif flat and engine != "native":
+            template_pdf = _clone(flat_master)
+        else:
+            template_pdf = _clone(master)
+    template_pdf.private.engine = engine  # after the cp1252 fallback, for metrics labels
+
+    if engine == "native":
+        # ✅ Every widget carries its own appearance, so viewers must not regenerate them
+        if template_pdf.Root.AcroForm is not None:
+            template_pdf.Root.AcroForm.update(PdfDict(NeedAppearances=PdfObject("false")))
+        with metrics.timer("pdf_stage_seconds", stage="overlay"):
+            pages = template_pages(template_pdf)
+            template_pdf.private.native_filled = pdf_native.fill_widgets(
+                pages, plan, data_dict, CHECK_FONT_SIZE, TEXT_FONT_SIZE)
+        return template_pdf
+
+    # ✅ Force checkbox appearance rendering
+    if template_pdf.Root.AcroForm is not None:
+        template_pdf.Root.AcroForm.update(PdfDict(NeedAppearances=PdfObject("true")))
+
+    # ✅ Only pages with something to draw get an overlay
+    with metrics.timer("pdf_stage_seconds", stage="overlay"):
+        pages = template_pages(template_pdf)
+        for page_index, ops in page_ops.items():
+            page = pages[page_index]
+            if engine == "direct":
+                ops = [op for op in ops if op[3]]
+                if not ops:
+                    continue
+                pdf_overlay.attach_font(page, pdf_overlay.overlay_font())
+                contents = pdf_overlay.overlay_stream(ops, CHECK_FONT_SIZE, TEXT_FONT_SIZE)
+            else:
+                contents = _reportlab_overlay(page, ops, "FillOverlay%d" % page_index)
+            if contents:
+                _append_contents(page, contents)
+
+    return template_pdf
+
+
+def flatten(template_pdf):
+    # ✅ Drop widget annotations so the filled form is non-editable
+    pages = template_pages(template_pdf)
+    if template_pdf.native_filled:
+        pdf_native.bake(pages, template_pdf.native_filled)
+    dropped = []
+    for page in pages:
+        if PdfName("Annots") in page:
+            dropped.extend(page.Annots)
+            del page[PdfName("Annots")]
+    template_pdf.private.dropped_annots = dropped  # for pdf_compact.prune_form
+    return template_pdf
+
+
+def _incremental_update(template_pdf):
+    # ✅ Appended-changes section for a copy of the full template, or None
+    source = template_pdf.source
+    if source is None or template_pdf.clone_memo is None:
+        return None
+    return pdf_incremental.update_section(template_pdf, source, template_pdf.clone_memo)
+
+
+def render_registration_pdf(data_dict, input_pdf_path=TEMPLATE_PATH, flat=True, engine=None, compact=None,
+                            output=None):
+    """Fill, flatten and serialize in one pass; returns the PDF bytes.
+
+    output="incremental" returns a pdf_incremental.IncrementalPdf instead: the
+    template's own (shared) bytes plus an appended update, not a rewrite of
+    every object. bytes(pdf) joins the two where one buffer is needed.
+    """
+    incremental = (output or OUTPUT_MODE) == "incremental"
+    try:
+        with metrics.timer("pdf_render_seconds", engine=engine or OVERLAY_ENGINE) as timed:
+            template_pdf = fill_template(input_pdf_path, data_dict, engine, flat=flat and not incremental,
+                                         incremental=incremental)
+            timed.relabel(engine=template_pdf.engine)
+            if flat:
+                with metrics.timer("pdf_stage_seconds", stage="flatten"):
+                    flatten(template_pdf)
+            if incremental and template_pdf.source is not None:
+                # ✅ The widgets stay in the template bytes; only the form entry goes
+                if flat:
+                    template_pdf.Root.AcroForm = None
+                with metrics.timer("pdf_stage_seconds", stage="write"):
+                    source = template_pdf.source
+                    return pdf_incremental.IncrementalPdf(
+                        source.data, _incremental_update(template_pdf), source.digest, input_pdf_path)
+            if compact is None:
+                compact = pdf_compact.COMPACT
+            if compact:
+                with metrics.timer("pdf_stage_seconds", stage="compact"):
+                    stats = pdf_compact.compact(
+                        template_pdf, template_pages(template_pdf), template_pdf.dropped_annots)
+                metrics.inc("pdf_compact_stream_bytes_saved_total", stats["stream_bytes_saved"])
+                metrics.inc("pdf_compact_stream_bytes_total", stats["stream_bytes_in"], when="before")
+                metrics.inc("pdf_compact_stream_bytes_total", stats["stream_bytes_in"] - stats["stream_bytes_saved"],
+                            when="after")
+                if not stats["complete"]:
+                    metrics.inc("pdf_compact_budget_exceeded_total")
+            with metrics.timer("pdf_stage_seconds", stage="write"):
+                out = BytesIO()
+                PdfWriter().write(out, template_pdf)
+    except Exception:
+        metrics.inc("pdf_failures_total")
+        raise
+    return out.getvalue()
+
+
+def attach_template(pdf):
+    """Give an IncrementalPdf unpickled from a worker this process's template bytes; returns pdf.
+
+    Raises ValueError if the template file changed since the worker rendered it.
+    """
+    if isinstance(pdf, pdf_incremental.IncrementalPdf) and pdf.base is None:
+        source = _template_entry(pdf.template_path)[0].source
+        if source is None or source.digest != pdf.digest:
+            raise ValueError("the PDF template changed while this form was being rendered")
+        pdf.base = source.data
+    return pdf
+
+
+def registration_filename(data_dict):
+    # ✅ Generate lowercase filename from form inputs
+    return f"{data_dict['LastName'].strip().lower()}_{data_dict['FirstName'].strip().lower()}-registration_form.pdf"
+
+
+def fill_pdf(input_pdf_path, output_pdf_path, data_dict):
+    try:
+        with metrics.timer("pdf_render_seconds", engine=OVERLAY_ENGINE) as timed:
+            template_pdf = fill_template(input_pdf_path, data_dict, incremental=OUTPUT_MODE == "incremental")
+            timed.relabel(engine=template_pdf.engine)
+            with metrics.timer("pdf_stage_seconds", stage="write"):
+                update = _incremental_update(template_pdf) if OUTPUT_MODE == "incremental" else None
+                if update is None:
+                    PdfWriter().write(output_pdf_path, template_pdf)
+                else:
+                    with open(output_pdf_path, "wb") as f:
+                        f.write(template_pdf.source.data)
+                        f.write(update)
+        return True, None
+
+    except Exception as e:
+        metrics.inc("pdf_failures_total")
+        return False, f"Failed to generate visible PDF: {e}"
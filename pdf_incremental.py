@@ -0,0 +1,188 @@
+# ---------------------------------------
+# ➕ INCREMENTAL-UPDATE OUTPUT (template bytes + appended changes)
+# ---------------------------------------
+# Instead of re-serializing the whole ~600-object template graph for every
+# registrant, this output mode writes the template file's original bytes
+# unchanged, followed by a PDF incremental update (ISO 32000 7.5.6): just the
+# objects the fill added or changed, a new xref section for them and a
+# trailer whose /Prev points at the template's own xref. Serialization cost
+# then follows the registrant's data, not the template size.
+#
+# The template's bytes and object numbers are kept with the cached master
+# (TemplateSource), so nothing is re-read per request. The fill works on a
+# partial clone (pdf_fill.SKELETON_KEYS: page tree, page resources, widgets,
+# form dictionary); everything else is the master's own objects, referenced
+# under their original numbers. Only the cloned objects are compared with
+# their masters: a clone whose direct content differs (or that points at a
+# replaced child) is rewritten under its original number; objects the fill
+# created get new numbers after the template's /Size.
+#
+# The result is an IncrementalPdf: the cached template bytes (shared by every
+# render, never copied) plus the update. It is joined only where one buffer is
+# unavoidable (bytes(pdf), e.g. the download button); pickled (worker -> app)
+# it carries just the update and the template's digest, and attach_base()
+# puts the receiving process's own copy of the template bytes back.
+
+import hashlib
+import re
+
+from pdfrw import PdfDict, PdfArray
+
+from pdf_stream import format_obj, is_indirect
+
+_STARTXREF = re.compile(rb"startxref\s+(\d+)\s+%%EOF\s*$")
+
+
+class TemplateSource:
+    """The parsed template's file bytes, last xref offset, /Size and object numbers."""
+
+    __slots__ = ("data", "digest", "prev", "size", "numbered", "trailer_extra")
+
+    def __init__(self, data, reader):
+        match = _STARTXREF.search(data[-1024:])
+        if match is None:
+            raise ValueError("template has no final startxref")
+        self.data = data if data.endswith(b"\n") else data + b"\n"
+        self.digest = hashlib.sha256(self.data).hexdigest()
+        self.prev = int(match.group(1))
+        self.size = int(reader.Size)
+        if any(int(gen) for _num, gen in reader.indirect_objects):
+            raise ValueError("template reuses object numbers (generation > 0)")  # format_obj writes "N 0 R"
+        # ✅ id(resolved object) -> (object number, object), for every indirect object in the file
+        self.numbered = {id(obj): (int(num), obj) for (num, _gen), obj in reader.indirect_objects.items()}
+        self.trailer_extra = " /ID %s" % format_obj(reader.ID, None) if reader.ID is not None else ""
+
+
+class IncrementalPdf:
+    """A rendered PDF as the shared template bytes (base) plus its appended update."""
+
+    __slots__ = ("base", "update", "digest", "template_path")
+
+    def __init__(self, base, update, digest, template_path):
+        self.base = base
+        self.update = update
+        self.digest = digest
+        self.template_path = template_path
+
+    def __len__(self):
+        return len(self.base) + len(self.update)
+
+    def __bytes__(self):
+        return self.base + self.update
+
+    def __getstate__(self):
+        # ✅ The base stays behind; the receiver re-attaches its own (attach_base)
+        return (self.update, self.digest, self.template_path)
+
+    def __setstate__(self, state):
+        self.update, self.digest, self.template_path = state
+        self.base = None
+
+
+def chunks(pdf):
+    """The byte chunks that make up pdf (bytes or IncrementalPdf), in order."""
+    return (pdf.base, pdf.update) if isinstance(pdf, IncrementalPdf) else (pdf,)
+
+
+def owned_size(pdf):
+    # ✅ Bytes this one PDF holds on its own (the template base is shared)
+    return len(pdf.update) if isinstance(pdf, IncrementalPdf) else len(pdf)
+
+
+_CONTAINERS = (PdfDict, PdfArray)
+_MISSING = object()
+
+
+def _same(clone, master, memo):
+    # ✅ Does the clone still serialize exactly like its master? _clone() keeps
+    #    scalars as the same objects, so an untouched value passes on identity.
+    if isinstance(master, PdfDict):
+        if clone.stream is not master.stream and clone.stream != master.stream:
+            return False
+        if len(clone) != len(master):
+            return False
+        pairs = ((dict.get(clone, key, _MISSING), value) for key, value in dict.items(master))
+    else:
+        if len(clone) != len(master):
+            return False
+        pairs = zip(list.__iter__(clone), list.__iter__(master))
+    for clone_value, master_value in pairs:
+        if clone_value is master_value:
+            continue
+        if isinstance(master_value, _CONTAINERS):
+            if memo.get(id(master_value)) is not clone_value:
+                return False  # pointed at a different object now
+            if not is_indirect(master_value) and not _same(clone_value, master_value, memo):
+                return False
+        elif clone_value != master_value or isinstance(clone_value, _CONTAINERS):
+            return False
+    return True
+
+
+def update_section(trailer, source, memo):
+    """The bytes to append after source.data for the filled clone `trailer`.
+
+    memo maps id(master object) -> its clone (from pdf_fill._clone).
+    """
+    # ✅ Only clones can differ from the template: compare each with its master
+    master_of = {}  # id(clone) -> object number
+    written = []  # (num, obj) in the order they are emitted
+    for master_id, clone in memo.items():
+        entry = source.numbered.get(master_id)
+        if entry is not None:
+            master_of[id(clone)] = entry[0]
+            if not _same(clone, entry[1], memo):
+                written.append((entry[0], clone))
+    numbers = {}  # id(obj) -> object number in the updated file
+    next_num = [source.size]
+
+    def number(obj):
+        num = numbers.get(id(obj))
+        if num is None:
+            num = master_of.get(id(obj))
+            if num is None:
+                entry = source.numbered.get(id(obj))  # ✅ shared, untouched template object
+                num = entry[0] if entry is not None else None
+            if num is None:
+                num = next_num[0]
+                next_num[0] += 1
+                written.append((num, obj))  # ✅ new object: always written
+            numbers[id(obj)] = num
+        return num
+
+    # ✅ Serialize; numbering new children may append more objects to `written`
+    base = len(source.data)
+    parts = []
+    offsets = {}
+    offset = base
+    i = 0
+    emitted = set()
+    while i < len(written):
+        num, obj = written[i]
+        i += 1
+        if num in emitted:
+            continue
+        emitted.add(num)
+        chunk = ("%d 0 obj\n%s\nendobj\n" % (num, format_obj(obj, number))).encode("latin-1")
+        offsets[num] = offset
+        offset += len(chunk)
+        parts.append(chunk)
+
+    root = number(trailer.Root)
+    lines = ["xref\n"]
+    nums = sorted(offsets)
+    start = 0
+    while start < len(nums):
+        end = start
+        while end + 1 < len(nums) and nums[end + 1] == nums[end] + 1:
+            end += 1
+        lines.append("%d %d\n" % (nums[start], end - start + 1))
+        lines.extend("%010d 00000 n\r\n" % offsets[n] for n in nums[start:end + 1])
+        start = end + 1
+    trailer_text = "<</Size %d /Root %d 0 R /Prev %d" % (max(next_num[0], source.size), root, source.prev)
+    if trailer.Info is not None:
+        trailer_text += " /Info %d 0 R" % number(trailer.Info)
+    lines.append("trailer\n%s%s>>\nstartxref\n%d\n%%%%EOF\n" % (trailer_text, source.trailer_extra, offset))
+    parts.append("".join(lines).encode("latin-1"))
+    return b"".join(parts)
+
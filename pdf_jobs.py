@@ -0,0 +1,268 @@
+# ---------------------------------------
+# 🏭 BACKGROUND PDF JOBS (process pool + admission control)
+# ---------------------------------------
+# "Generate PDF" hands the render to a bounded pool of worker processes
+# (the pdfrw/ReportLab work is CPU-bound, so threads would just queue on the
+# GIL) and gets a job id back. The submitting run waits up to INLINE_WAIT
+# for the common fast case; otherwise the page polls with poll() from a
+# fragment until the bytes are ready.
+#
+# Admission control: at most MAX_INFLIGHT unfinished jobs process-wide and
+# MAX_PER_SESSION per session; beyond that submit() raises Busy and the page
+# asks the user to retry. PDF_WORKERS=0 renders in the calling thread (same
+# limits), e.g. where worker processes aren't allowed.
+#
+# Before any of that, a submit whose PDF is already in pdf_cache is answered
+# with a finished job, and one identical to a job still rendering shares that
+# job's future (coalesced; it takes no queue slot).
+#
+# A job's future resolves to (pdf, records): the worker captures the
+# render's metrics (stage timings, renders/failures) and the parent replays
+# them into its own registry, so they show up on /metrics.
+
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+
+import metrics
+import pdf_fill
+import pdf_worker
+from pdf_cache import cache_key, pdf_cache
+from pdf_incremental import owned_size
+
+WORKERS = int(os.environ.get("PDF_WORKERS", str(os.cpu_count() or 1)))
+MAX_INFLIGHT = int(os.environ.get("PDF_MAX_INFLIGHT", str(max(WORKERS, 1) * 4)))
+MAX_PER_SESSION = int(os.environ.get("PDF_MAX_PER_SESSION", "1"))
+INLINE_WAIT = float(os.environ.get("PDF_INLINE_WAIT", "0.25"))  # seconds the submitting run may wait
+POLL_INTERVAL = float(os.environ.get("PDF_POLL_INTERVAL", "0.5"))
+START_METHOD = os.environ.get("PDF_START_METHOD", "spawn")  # never fork a threaded server
+JOB_TTL = 300  # seconds an uncollected finished job is kept (e.g. the tab was closed)
+
+
+class Busy(Exception):
+    """Admission refused; reason is "global" or "session"."""
+
+    def __init__(self, reason):
+        super().__init__(f"PDF queue full ({reason})")
+        self.reason = reason
+
+
+class Job:
+    __slots__ = ("id", "session", "future", "submitted")
+
+    def __init__(self, session, future):
+        self.id = uuid.uuid4().hex
+        self.session = session
+        self.future = future
+        self.submitted = time.monotonic()
+
+
+_lock = threading.RLock()  # done callbacks may run inside submit()
+_jobs = {}  # job id -> Job
+_rendering = {}  # cache key -> future of the unfinished render
+_pool = None
+
+
+def _render(data, template_path):
+    # Runs in a worker process (module-level so it pickles by reference)
+    with metrics.capture() as records:
+        try:
+            return pdf_fill.render_registration_pdf(data, template_path), records
+        except Exception as e:
+            e.recorded = records  # ✅ pickled along with the exception
+            raise
+
+
+def _get_pool(template_path):
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(
+            max_workers=WORKERS,
+            mp_context=pdf_worker.context(START_METHOD),  # ✅ workers don't re-run app.py
+            initializer=pdf_fill.warm_template,
+            initargs=(template_path,),
+        )
+    return _pool
+
+
+def _pool_submit(template_path, data):
+    return _get_pool(template_path).submit(_render, data, template_path)
+
+
+def _reset_pool():
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _reap(now):
+    # ✅ Drop finished jobs nobody came back for
+    for job_id in [j.id for j in _jobs.values() if j.future.done() and now - j.submitted > JOB_TTL]:
+        del _jobs[job_id]
+
+
+def _finished(job):
+    def callback(future):
+        outcome = "failed" if future.cancelled() or future.exception() else "done"
+        metrics.observe("pdf_job_seconds", time.monotonic() - job.submitted, outcome=outcome)
+    return callback
+
+
+def _replay(future):
+    # ✅ Record the worker's metrics here, once per render (not per coalesced job)
+    if future.cancelled():
+        return
+    error = future.exception()
+    metrics.replay(getattr(error, "recorded", None) if error else future.result()[1])
+
+
+def _stored(key):
+    def callback(future):
+        with _lock:
+            if _rendering.get(key) is future:
+                del _rendering[key]
+        if not future.cancelled() and future.exception() is None:
+            try:
+                pdf_cache.put(key, pdf_fill.attach_template(future.result()[0]))
+            except ValueError:
+                pass  # ✅ template changed mid-render; poll() reports it
+    return callback
+
+
+def _add_job(session_id, future):
+    job = Job(session_id, future)
+    _jobs[job.id] = job
+    return job.id
+
+
+def submit(session_id, data, template_path=None):
+    """Queue a render (or reuse a cached / identical one); returns a job id or raises Busy."""
+    template_path = template_path or pdf_fill.TEMPLATE_PATH
+    try:
+        key = cache_key(data, template_path)
+    except OSError:
+        key = None  # missing template: let the render report it
+    with _lock:
+        _reap(time.monotonic())
+        cached = pdf_cache.get(key) if key else None
+        if cached is not None:
+            future = Future()
+            future.set_result((cached, None))
+            return _add_job(session_id, future)
+        rendering = _rendering.get(key)
+        if rendering is not None:
+            metrics.inc("pdf_jobs_coalesced_total")
+            return _add_job(session_id, rendering)
+
+        pending = [j for j in _jobs.values() if not j.future.done()]
+        if len({id(j.future) for j in pending}) >= MAX_INFLIGHT:
+            reason = "global"
+        elif sum(1 for j in pending if j.session == session_id) >= MAX_PER_SESSION:
+            reason = "session"
+        else:
+            reason = None
+        if reason:
+            metrics.inc("pdf_jobs_rejected_total", reason=reason)
+            raise Busy(reason)
+
+        if WORKERS <= 0:
+            future = Future()
+        else:
+            try:
+                future = _pool_submit(template_path, data)
+            except BrokenProcessPool:
+                _reset_pool()  # ✅ A worker died; start a fresh pool once
+                future = _pool_submit(template_path, data)
+        job = Job(session_id, future)
+        _jobs[job.id] = job
+        future.add_done_callback(_replay)
+        future.add_done_callback(_finished(job))
+        if key:
+            _rendering[key] = future
+            future.add_done_callback(_stored(key))
+        metrics.inc("pdf_jobs_submitted_total")
+
+    if WORKERS <= 0:
+        try:
+            future.set_result(_render(data, template_path))
+        except Exception as e:
+            future.set_exception(e)
+    return job.id
+
+
+def poll(job_id, timeout=0):
+    """("pending", None) | ("done", pdf) | ("failed", exception) | ("missing", None).
+
+    pdf is bytes, or an IncrementalPdf with PDF_OUTPUT=incremental (bytes(pdf) joins it).
+
+    A finished job is handed out once and then forgotten.
+    """
+    with _lock:
+        job = _jobs.get(job_id)
+    if job is None:
+        return "missing", None
+    try:
+        payload = pdf_fill.attach_template(job.future.result(timeout=timeout)[0])
+        state = "done"
+    except TimeoutError:
+        return "pending", None
+    except BrokenProcessPool as e:
+        with _lock:
+            _reset_pool()
+        payload, state = e, "failed"
+    except Exception as e:
+        payload, state = e, "failed"
+    with _lock:
+        _jobs.pop(job_id, None)
+    return state, payload
+
+
+def session_bytes(session_id):
+    """Bytes of finished PDFs held for session_id that it hasn't collected yet."""
+    with _lock:
+        futures = [j.future for j in _jobs.values() if j.session == session_id and j.future.done()]
+    return sum(owned_size(f.result()[0]) for f in futures if not f.cancelled() and f.exception() is None)
+
+
+def forget_session(session_id):
+    # ✅ Idle-session eviction (session_memory): drop its uncollected results
+    with _lock:
+        for job_id in [j.id for j in _jobs.values() if j.session == session_id and j.future.done()]:
+            del _jobs[job_id]
+
+
+def stats():
+    with _lock:
+        futures = list({id(j.future): j.future for j in _jobs.values()}.values())
+    inflight = sum(1 for f in futures if not f.done())
+    running = sum(1 for f in futures if f.running())
+    return {
+        "workers": WORKERS,
+        "inflight": inflight,
+        "running": running,
+        "queued": inflight - running,
+        "uncollected": len(futures) - inflight,
+        "max_inflight": MAX_INFLIGHT,
+    }
+
+
+def _queue_metrics():
+    s = stats()
+    return [
+        ("pdf_jobs_inflight", "gauge", "Unfinished PDF jobs (queued + running).", {(): s["inflight"]}),
+        ("pdf_jobs_queued", "gauge", "PDF jobs waiting for a worker.", {(): s["queued"]}),
+        ("pdf_jobs_running", "gauge", "PDF jobs being rendered.", {(): s["running"]}),
+    ]
+
+
+metrics.register_collector(_queue_metrics)
+metrics.HELP.update({
+    "pdf_job_seconds": "Time from submit to finished render, by outcome.",
+    "pdf_jobs_submitted_total": "PDF jobs accepted.",
+    "pdf_jobs_rejected_total": "PDF jobs refused by admission control, by reason.",
+    "pdf_jobs_coalesced_total": "Submits that joined an identical job still rendering.",
+})
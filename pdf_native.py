@@ -0,0 +1,127 @@
+# ---------------------------------------
+# 🧩 NATIVE ACROFORM FILLING (field values + appearance streams)
+# ---------------------------------------
+# The "native" engine fills the form's own widgets instead of drawing over
+# them: each filled widget gets its /V value and an /AP normal appearance.
+# The registration form's "checkboxes" are small text widgets, so a ticked
+# box is the value "X" with an "on" appearance, and every other box keeps an
+# empty "off" appearance. Both are built once per template (one "on" stream
+# per box size) and shared by reference across every filled document; only
+# the text fields get a per-request appearance stream. Text uses the shared
+# cp1252 DejaVuSans subset from pdf_overlay, so callers fall back to the
+# ReportLab overlay for anything outside cp1252 (see pdf_overlay.can_encode).
+#
+# Flattening bakes the filled appearances into the page (one "Do" per
+# filled widget) and then drops the widgets, like the overlay engines.
+
+import threading
+
+from pdfrw import PdfDict, PdfName, PdfArray, PdfObject, PdfString
+
+import pdf_overlay
+
+CAP_HEIGHT = 0.73  # DejaVuSans "X" height per point of font size
+XOBJECT_PREFIX = "FillAP"  # page /XObject names used when flattening
+
+_build_lock = threading.Lock()
+
+
+def _form_xobject(width, height, content, font=None):
+    stream = PdfDict(
+        Type=PdfName.XObject,
+        Subtype=PdfName.Form,
+        BBox=PdfArray([PdfObject(0), PdfObject(0), PdfObject("%.3f" % width), PdfObject("%.3f" % height)]),
+    )
+    if font is not None:
+        stream.Resources = PdfDict(Font=PdfDict({pdf_overlay.FONT_RESOURCE: font}))
+    stream.indirect = True
+    stream.stream = content
+    return stream
+
+
+def _text_ops(size, x, y, text):
+    return "/Tx BMC q BT 0 g /%s %s Tf %.3f %.3f Td %s Tj ET Q EMC" % (
+        pdf_overlay.FONT_RESOURCE[1:], size, x, y, pdf_overlay._literal(text))
+
+
+def _check_size(height, check_size):
+    # ✅ Appearances are clipped to the box, so a tall "X" is shrunk to fit
+    return min(check_size, round((height - 1) / CAP_HEIGHT, 2))
+
+
+def shared_appearances(plan, check_size):
+    """{"on": {(w, h): stream}, "off": stream}, built once per compiled template plan."""
+    appearances = plan.get("native")
+    if appearances is None:
+        with _build_lock:
+            appearances = plan.get("native")
+            if appearances is None:
+                font = pdf_overlay.overlay_font()
+                on = {}
+                for choices in plan["checks"].values():
+                    for ops in choices.values():
+                        for op in ops:
+                            w, h = op[5], op[6]
+                            if (w, h) not in on:
+                                on[(w, h)] = _form_xobject(w, h, _text_ops(_check_size(h, check_size), 1, 1, "X"), font)
+                appearances = plan["native"] = {"on": on, "off": _form_xobject(1, 1, "/Tx BMC EMC")}
+    return appearances
+
+
+def fill_widgets(pages, plan, data_dict, check_size, text_size):
+    """Set /V and /AP on the (cloned) widgets; returns the filled (page_index, widget) list."""
+    appearances = shared_appearances(plan, check_size)
+    font = pdf_overlay.overlay_font()
+    filled = []
+    for data_key, choices in plan["checks"].items():
+        chosen = data_dict.get(data_key)
+        for value, ops in choices.items():
+            for page_index, order, _, _, _, w, h in ops:
+                widget = pages[page_index].Annots[order]
+                if value == chosen:
+                    widget.V = PdfString.encode("X")
+                    widget.AP = PdfDict(N=appearances["on"][(w, h)])
+                    filled.append((page_index, widget))
+                else:
+                    widget.AP = PdfDict(N=appearances["off"])
+    texts = plan["texts"]
+    for key, value in data_dict.items():
+        text = str(value)
+        for page_index, order, _, _, _, w, h in texts.get(key, ()):
+            widget = pages[page_index].Annots[order]
+            widget.V = PdfString.encode(text)
+            if text:
+                widget.AP = PdfDict(N=_form_xobject(w, h, _text_ops(text_size, 2, 2, text), font))
+                filled.append((page_index, widget))
+    return filled
+
+
+def bake(pages, filled):
+    # ✅ Draw each filled appearance where its widget sat, before the widgets are dropped
+    by_page = {}
+    for page_index, widget in filled:
+        by_page.setdefault(page_index, []).append(widget)
+    count = 0
+    for page_index, widgets in by_page.items():
+        page = pages[page_index]
+        resources = page.Resources
+        if resources is None:
+            resources = page.Resources = PdfDict()
+        xobjects = resources.XObject
+        if xobjects is None:
+            xobjects = resources.XObject = PdfDict()
+        lines = ["q"]
+        for widget in widgets:
+            name = "%s%d" % (XOBJECT_PREFIX, count)
+            count += 1
+            xobjects[PdfName(name)] = widget.AP.N
+            x, y = min(float(widget.Rect[0]), float(widget.Rect[2])), min(float(widget.Rect[1]), float(widget.Rect[3]))
+            lines.append("q 1 0 0 1 %.3f %.3f cm /%s Do Q" % (x, y, name))
+        lines.append("Q")
+        contents = PdfDict()
+        contents.indirect = True
+        contents.stream = "\n".join(lines)
+        if page.Contents:
+            page.Contents = PdfArray([page.Contents, contents])
+        else:
+            page.Contents = contents
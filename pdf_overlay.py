@@ -0,0 +1,131 @@
+# ---------------------------------------
+# ✍️ DIRECT CONTENT-STREAM OVERLAY WRITER
+# ---------------------------------------
+# Emits the PDF text operators for a page's fill ops straight into a pdfrw
+# stream object, instead of drawing on a ReportLab canvas, saving it and
+# parsing it back. The text font is a DejaVuSans subset covering cp1252
+# (ASCII + Latin-1 + the usual Windows punctuation, so ñ/é/’ all work). It is
+# built once per process and shared by reference in every filled document.
+
+import threading
+import zlib
+
+from pdfrw import PdfDict, PdfName, PdfArray, PdfObject
+from reportlab.pdfbase.ttfonts import TTFontFace, makeToUnicodeCMap, FF_SYMBOLIC, FF_NONSYMBOLIC
+
+FONT_PATH = "DejaVuSans.ttf"
+FONT_RESOURCE = PdfName("DejaVuFill")  # ✅ Must not clash with the template's /F1../F9, /He, /HeBo
+ENCODING = "cp1252"
+
+_font_cache = {}
+_font_lock = threading.Lock()
+
+
+def _subset_codes():
+    # ✅ code -> unicode code point; 0 (.notdef) for control and undefined codes
+    subset = [0] * 256
+    for code in list(range(32, 127)) + list(range(128, 256)):
+        try:
+            subset[code] = ord(bytes([code]).decode(ENCODING))
+        except UnicodeDecodeError:
+            pass
+    return subset
+
+
+def _flate_stream(data, **entries):
+    stream = PdfDict(Filter=PdfName.FlateDecode, **entries)
+    stream.indirect = True
+    stream.stream = zlib.compress(data, 9).decode("latin-1")
+    return stream
+
+
+def _build_font(font_path):
+    face = TTFontFace(font_path)
+    subset = _subset_codes()
+    base_font = "AAAAAA+" + face.name.decode("latin-1")
+
+    program = face.makeSubset(subset)
+    font_file = _flate_stream(program, Length1=PdfObject(len(program)))
+    to_unicode = _flate_stream(makeToUnicodeCMap(base_font, subset).encode("latin-1"))
+
+    descriptor = PdfDict(
+        Type=PdfName.FontDescriptor,
+        FontName=PdfName(base_font),
+        Flags=PdfObject((face.flags & ~FF_NONSYMBOLIC) | FF_SYMBOLIC),
+        FontBBox=PdfArray([PdfObject(v) for v in face.bbox]),
+        ItalicAngle=PdfObject(face.italicAngle),
+        Ascent=PdfObject(face.ascent),
+        Descent=PdfObject(face.descent),
+        CapHeight=PdfObject(face.capHeight),
+        StemV=PdfObject(face.stemV),
+        MissingWidth=PdfObject(int(face.defaultWidth)),
+        FontFile2=font_file,
+    )
+    descriptor.indirect = True
+
+    font = PdfDict(
+        Type=PdfName.Font,
+        Subtype=PdfName.TrueType,
+        BaseFont=PdfName(base_font),
+        FirstChar=PdfObject(0),
+        LastChar=PdfObject(255),
+        Widths=PdfArray([PdfObject(int(round(face.getCharWidth(c)))) for c in subset]),
+        FontDescriptor=descriptor,
+        ToUnicode=to_unicode,
+    )
+    font.indirect = True
+    return font
+
+
+def overlay_font(font_path=FONT_PATH):
+    """Shared, read-only font dict for overlay text (built once per process)."""
+    with _font_lock:
+        font = _font_cache.get(font_path)
+        if font is None:
+            font = _font_cache[font_path] = _build_font(font_path)
+    return font
+
+
+def can_encode(page_ops):
+    # ✅ The direct writer only covers cp1252; anything else needs the ReportLab path
+    try:
+        for ops in page_ops.values():
+            for op in ops:
+                op[3].encode(ENCODING)
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def _literal(text):
+    # ✅ Unencodable characters become "?" (callers that care check can_encode first)
+    raw = text.encode(ENCODING, "replace").decode("latin-1")
+    return "(" + raw.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") + ")"
+
+
+def overlay_stream(ops, check_size, text_size):
+    """Build one content stream for a page's (kind, x, y, text) ops."""
+    lines = ["q 0 g"]
+    for kind, x, y, text in ops:
+        if kind == "check":
+            size, x, y = check_size, x + 1, y + 1
+        else:
+            size, x, y = text_size, x + 2, y + 2
+        lines.append("BT /%s %s Tf %.3f %.3f Td %s Tj ET" % (
+            FONT_RESOURCE[1:], size, x, y, _literal(text)))
+    lines.append("Q")
+    stream = PdfDict()
+    stream.indirect = True
+    stream.stream = "\n".join(lines)
+    return stream
+
+
+def attach_font(page, font):
+    # ✅ Pages share the (cloned) /Resources dict, so this is one key per document
+    resources = page.Resources
+    if resources is None:
+        resources = page.Resources = PdfDict()
+    fonts = resources.Font
+    if fonts is None:
+        fonts = resources.Font = PdfDict()
+    fonts[FONT_RESOURCE] = font
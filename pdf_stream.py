@@ -0,0 +1,124 @@
+# ---------------------------------------
+# 🧾 STREAMING PDF WRITER
+# ---------------------------------------
+# pdfrw's PdfWriter formats the whole object graph before writing a byte.
+# This writer emits objects as soon as they are added, so a long document
+# (e.g. a roster with hundreds of registrants) never sits in memory. Objects
+# marked as shared are written once and referenced from every later graph.
+
+from pdfrw import PdfDict, PdfArray, PdfObject
+from pdfrw.pdfwriter import user_fmt
+
+
+def ref(num):
+    # ✅ Reference to an object number (e.g. a reserved /Pages node not written yet)
+    return PdfObject("%d 0 R" % num)
+
+
+def format_obj(obj, objnum_for):
+    """Serialize one object body; indirect children become 'N 0 R' via objnum_for(child)."""
+    if isinstance(obj, PdfDict):
+        parts = []
+        for key, value in sorted(obj.iteritems(), key=lambda kv: getattr(kv[0], "encoded", None) or kv[0]):
+            parts.append(key)
+            parts.append(_format_value(value, objnum_for))
+        result = "<<%s>>" % " ".join(parts)
+        if obj.stream is not None:
+            result = "%s\nstream\n%s\nendstream" % (result, obj.stream)
+        return result
+    if isinstance(obj, (PdfArray, list, tuple)):
+        return "[%s]" % " ".join(_format_value(v, objnum_for) for v in obj)
+    if hasattr(obj, "indirect"):
+        return str(getattr(obj, "encoded", None) or obj)
+    return user_fmt(obj)
+
+
+def is_indirect(obj):
+    if isinstance(obj, PdfDict):
+        return bool(obj.indirect) or obj.stream is not None
+    return isinstance(obj, (PdfArray, PdfObject)) and getattr(obj, "indirect", False) is True
+
+
+def _format_value(value, objnum_for):
+    if is_indirect(value):
+        return "%d 0 R" % objnum_for(value)
+    return format_obj(value, objnum_for)
+
+
+class StreamingPdfWriter:
+    """Write a PDF incrementally to a binary file object.
+
+    writer = StreamingPdfWriter(f)
+    pages_num = writer.reserve()
+    ... writer.add(page) for each page ...
+    writer.add(pages_dict, num=pages_num)
+    writer.close(root_num=writer.add(catalog))
+    """
+
+    def __init__(self, f, version="1.4"):
+        self.f = f
+        self.offset = 0
+        self.offsets = {}
+        self.next_num = 1
+        self._shared = {}  # id(obj) -> (objnum, obj); keeps shared objects alive
+        self._emit("%%PDF-%s\n%%\xe2\xe3\xcf\xd3\n" % version)
+
+    def _emit(self, text):
+        data = text.encode("latin-1")
+        self.f.write(data)
+        self.offset += len(data)
+
+    def reserve(self):
+        num = self.next_num
+        self.next_num += 1
+        return num
+
+    def add(self, obj, num=None, shared=False):
+        """Write obj and every indirect object it reaches that is not written yet.
+
+        Returns obj's object number. With shared=True the written objects are
+        remembered, so later graphs reference them instead of copying them.
+        """
+        local = {}
+        queue = []
+
+        def objnum_for(child):
+            entry = self._shared.get(id(child))
+            if entry is not None:
+                return entry[0]
+            child_num = local.get(id(child))
+            if child_num is None:
+                child_num = local[id(child)] = self.reserve()
+                queue.append((child_num, child))
+                if shared:
+                    self._shared[id(child)] = (child_num, child)
+            return child_num
+
+        if num is None:
+            entry = self._shared.get(id(obj))
+            if entry is not None:
+                return entry[0]
+            num = self.reserve()
+        local[id(obj)] = num
+        queue.append((num, obj))
+        if shared:
+            self._shared[id(obj)] = (num, obj)
+        while queue:
+            obj_num, item = queue.pop(0)
+            body = format_obj(item, objnum_for)
+            self.offsets[obj_num] = self.offset
+            self._emit("%d 0 obj\n%s\nendobj\n" % (obj_num, body))
+        return num
+
+    def close(self, root_num, info_num=None):
+        missing = [n for n in range(1, self.next_num) if n not in self.offsets]
+        if missing:
+            raise ValueError("reserved objects never written: %s" % missing[:10])
+        xref_offset = self.offset
+        lines = ["xref\n0 %d\n" % self.next_num, "0000000000 65535 f\r\n"]
+        lines.extend("%010d 00000 n\r\n" % self.offsets[n] for n in range(1, self.next_num))
+        trailer = "<</Root %d 0 R /Size %d" % (root_num, self.next_num)
+        if info_num is not None:
+            trailer += " /Info %d 0 R" % info_num
+        lines.append("trailer\n\n%s>>\nstartxref\n%d\n%%%%EOF\n" % (trailer, xref_offset))
+        self._emit("".join(lines))
@@ -0,0 +1,75 @@
+# ---------------------------------------
+# 🧵 SPAWN CONTEXT FOR THE PDF WORKER POOL
+# ---------------------------------------
+# A spawned child normally re-runs the parent's __main__ before it does any
+# work. Under Streamlit that is app.py (the whole page), and which module
+# sys.modules["__main__"] points at changes with every script run on every
+# session's thread. context() returns a spawn context whose children skip
+# that step: they start from multiprocessing's own entry point, and the
+# worker function, initializer and their arguments are imported by module
+# name when they're unpickled (pdf_jobs, pdf_fill). Nothing process-wide is
+# changed while workers start.
+#
+# Only "spawn" needs this; "fork" copies the parent instead of re-importing
+# it, and "forkserver" gets the stock context.
+
+import io
+import multiprocessing
+import os
+from multiprocessing import context as mp_context, popen_spawn_posix, reduction, resource_tracker, spawn, util
+
+
+def _preparation_data(name):
+    # ✅ What spawn would send the child, minus "re-run __main__"
+    data = spawn.get_preparation_data(name)
+    data.pop("init_main_from_name", None)
+    data.pop("init_main_from_path", None)
+    return data
+
+
+class _Popen(popen_spawn_posix.Popen):
+    # popen_spawn_posix.Popen._launch, with _preparation_data() for spawn.get_preparation_data()
+    def _launch(self, process_obj):
+        tracker_fd = resource_tracker.getfd()
+        self._fds.append(tracker_fd)
+        prep_data = _preparation_data(process_obj._name)
+        fp = io.BytesIO()
+        mp_context.set_spawning_popen(self)
+        try:
+            reduction.dump(prep_data, fp)
+            reduction.dump(process_obj, fp)
+        finally:
+            mp_context.set_spawning_popen(None)
+
+        parent_r = child_w = child_r = parent_w = None
+        try:
+            parent_r, child_w = os.pipe()
+            child_r, parent_w = os.pipe()
+            cmd = spawn.get_command_line(tracker_fd=tracker_fd, pipe_handle=child_r)
+            self._fds.extend([child_r, child_w])
+            self.pid = util.spawnv_passfds(spawn.get_executable(), cmd, self._fds)
+            self.sentinel = parent_r
+            with open(parent_w, "wb", closefd=False) as f:
+                f.write(fp.getbuffer())
+        finally:
+            self.finalizer = util.Finalize(self, util.close_fds, [fd for fd in (parent_r, parent_w) if fd is not None])
+            for fd in (child_r, child_w):
+                if fd is not None:
+                    os.close(fd)
+
+
+class _WorkerProcess(mp_context.SpawnProcess):
+    @staticmethod
+    def _Popen(process_obj):
+        return _Popen(process_obj)
+
+
+class _WorkerContext(mp_context.SpawnContext):
+    Process = _WorkerProcess
+
+
+def context(method="spawn"):
+    """multiprocessing context for a worker pool started with `method`."""
+    if method == "spawn":
+        return _WorkerContext()
+    return multiprocessing.get_context(method)
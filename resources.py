@@ -0,0 +1,142 @@
+# ---------------------------------------
+# 🚀 ONE-TIME RESOURCE BOOTSTRAP
+# ---------------------------------------
+# app.py runs top to bottom on every Streamlit rerun; this module is imported
+# once per server process, so anything loaded here is loaded exactly once.
+# bootstrap() is the warm-up phase: fonts, the PDF template (parse + fill
+# plan), the chatbot response catalog and the resized static images. Load
+# times and states are exported as app_resource_load_seconds{resource} and
+# app_resource_ready{resource} (Streamlit leaves INFO logs unshown).
+# A missing font is downloaded on a background thread with a timeout, so no
+# user rerun ever waits on the network.
+#
+# Pre-warm from a shell (e.g. in a container build): python resources.py
+
+import logging
+import os
+import threading
+import time
+import urllib.request
+
+import assets
+import chatbot
+import metrics
+import pdf_fill
+import pdf_overlay
+
+log = logging.getLogger(__name__)
+
+FONT_URL = "https://raw.githubusercontent.com/ediesonmalabag-source/chat/main/DejaVuSans.ttf"
+DOWNLOAD_TIMEOUT = 15  # seconds
+
+_lock = threading.Lock()
+_started = False
+_status = {}  # name -> {"state": "loading" | "ready" | "failed", "ms": float, "error": str}
+
+
+def _set(name, **info):
+    with _lock:
+        _status[name] = info
+
+
+def _timed(name, loader):
+    start = time.perf_counter()
+    try:
+        loader()
+    except Exception as e:
+        _set(name, state="failed", error=f"{type(e).__name__}: {e}")
+        log.error("resource %s failed: %s", name, e)
+        return
+    ms = (time.perf_counter() - start) * 1000
+    _set(name, state="ready", ms=ms)
+    log.info("resource %s ready in %.1f ms", name, ms)
+
+
+def _load_fonts():
+    pdf_fill.register_fonts()
+    pdf_overlay.overlay_font()
+
+
+def _download_fonts():
+    # ✅ Background thread: fetch to a temp name, then atomically move into place
+    font_path = pdf_overlay.FONT_PATH
+    tmp_path = font_path + ".part"
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(FONT_URL, timeout=DOWNLOAD_TIMEOUT) as resp, open(tmp_path, "wb") as f:
+            f.write(resp.read())
+        os.replace(tmp_path, font_path)
+    except Exception as e:
+        _set("fonts", state="failed", error=f"download failed: {e}")
+        log.error("font download failed after %.1f s: %s", time.perf_counter() - start, e)
+        return
+    log.info("font downloaded in %.1f ms", (time.perf_counter() - start) * 1000)
+    _timed("fonts", _load_fonts)
+
+
+def bootstrap(block=True):
+    """Load shared resources once per process; later calls return immediately.
+
+    Returns a snapshot of each resource's status. block=False runs the local
+    loads on a background thread too (e.g. when called from a request path).
+    """
+    global _started
+    with _lock:
+        first = not _started
+        _started = True
+    if first:
+        if os.path.exists(pdf_overlay.FONT_PATH):
+            loaders = [("fonts", _load_fonts)]
+        else:
+            _set("fonts", state="loading")
+            threading.Thread(target=_download_fonts, name="font-download", daemon=True).start()
+            loaders = []
+        loaders += [
+            ("template", pdf_fill.fill_plan),
+            ("catalog", chatbot.load_catalog),
+        ]
+        for name, _ in loaders:
+            _set(name, state="loading")
+        metrics.start_exporters()
+
+        # ✅ Image variants take seconds on a fresh deploy; pages use the original URLs until then
+        _set("assets", state="loading")
+        threading.Thread(target=_timed, args=("assets", assets.build_assets), name="asset-build", daemon=True).start()
+
+        def run():
+            for name, loader in loaders:
+                _timed(name, loader)
+
+        if block:
+            run()
+        else:
+            threading.Thread(target=run, name="resource-warmup", daemon=True).start()
+    return status()
+
+
+def status():
+    with _lock:
+        return {name: dict(info) for name, info in _status.items()}
+
+
+def _resource_metrics():
+    current = status()
+    return [
+        ("app_resource_load_seconds", "gauge", "Time bootstrap() took to load each shared resource.",
+         {(("resource", name),): info["ms"] / 1000 for name, info in current.items() if "ms" in info}),
+        ("app_resource_ready", "gauge", "1 once a shared resource is loaded, 0 while loading or failed.",
+         {(("resource", name),): int(info["state"] == "ready") for name, info in current.items()}),
+    ]
+
+
+metrics.register_collector(_resource_metrics)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    bootstrap()
+    for thread in threading.enumerate():
+        if thread.name in ("font-download", "asset-build"):
+            thread.join()
+    for name, info in status().items():
+        print(f"{name:>9}: {info}")
@@ -0,0 +1,130 @@
+# ---------------------------------------
+# 🗒️ DAILY ROSTER EXPORT (merged registrations)
+# ---------------------------------------
+# Merges many filled registrations into one PDF. Each template page is
+# stored once as a shared Form XObject (pagexobj); every registrant page is
+# just "/Tpl Do" plus that registrant's small overlay stream (a ReportLab
+# form with its own font for pages with text outside cp1252). Pages are
+# streamed to the output as they are built, so memory stays flat.
+#
+# Usage:
+#   python roster.py registrants.csv -o roster.pdf
+
+import argparse
+import sys
+import time
+
+from pdfrw import PdfDict, PdfName, PdfArray
+from pdfrw.buildxobj import pagexobj
+from pdfrw.compress import compress
+
+import pdf_fill
+import pdf_overlay
+from batch_fill import read_rows, normalize_row
+from pdf_stream import StreamingPdfWriter, ref
+
+TEMPLATE_XOBJECT = PdfName("Tpl")
+FILL_XOBJECT = PdfName("Fill")
+
+
+def _shared_page_parts(template_pdf):
+    # ✅ One (MediaBox, Resources, "draw template" stream) per template page
+    font = pdf_overlay.overlay_font()
+    parts = []
+    for page in pdf_fill.template_pages(template_pdf):
+        xobj = pagexobj(page)
+        resources = PdfDict(
+            XObject=PdfDict({TEMPLATE_XOBJECT: xobj}),
+            Font=PdfDict({pdf_overlay.FONT_RESOURCE: font}),
+        )
+        resources.indirect = True
+        draw = PdfDict()
+        draw.indirect = True
+        draw.stream = "q %s Do Q" % TEMPLATE_XOBJECT
+        parts.append((page.inheritable.MediaBox, resources, draw))
+    return parts
+
+
+def export_roster(rows, output, template_path=None):
+    """Write one merged PDF for an iterable of registrant data dicts.
+
+    output is a binary file object. Returns the number of registrants written.
+    """
+    template_path = template_path or pdf_fill.TEMPLATE_PATH
+    template_pdf = pdf_fill.load_template(template_path)
+    plan = pdf_fill.fill_plan(template_path)
+
+    writer = StreamingPdfWriter(output)
+    pages_num = writer.reserve()
+    parts = _shared_page_parts(template_pdf)
+    for _, resources, draw in parts:
+        writer.add(resources, shared=True)
+        writer.add(draw, shared=True)
+
+    kids = []
+    count = 0
+    for data_dict in rows:
+        page_ops = pdf_fill.plan_page_ops(plan, data_dict)
+        for page_index, (mediabox, resources, draw) in enumerate(parts):
+            contents = [draw]
+            ops = [op for op in page_ops.get(page_index, ()) if op[3]]
+            if ops and pdf_overlay.can_encode({page_index: ops}):
+                overlay = pdf_overlay.overlay_stream(ops, pdf_fill.CHECK_FONT_SIZE, pdf_fill.TEXT_FONT_SIZE)
+                compress([overlay])
+                contents.append(overlay)
+            elif ops:
+                # ✅ Text outside cp1252 (e.g. "Nguyễn"): a ReportLab form with its own
+                #    embedded font, in page resources of its own, as fill_pdf falls back
+                resources = PdfDict(
+                    XObject=PdfDict({TEMPLATE_XOBJECT: resources.XObject[TEMPLATE_XOBJECT],
+                                     FILL_XOBJECT: pdf_fill.reportlab_form(ops)}),
+                    Font=resources.Font,
+                )
+                contents.append(pdf_fill.draw_form(FILL_XOBJECT[1:]))
+            page = PdfDict(
+                Type=PdfName.Page,
+                Parent=ref(pages_num),
+                MediaBox=mediabox,
+                Resources=resources,
+                Contents=PdfArray(contents),
+            )
+            kids.append(writer.add(page))
+        count += 1
+
+    writer.add(PdfDict(
+        Type=PdfName.Pages,
+        Kids=PdfArray([ref(n) for n in kids]),
+        Count=len(kids),
+    ), num=pages_num)
+    writer.close(writer.add(PdfDict(Type=PdfName.Catalog, Pages=ref(pages_num))))
+    return count
+
+
+def _valid_rows(input_path, skipped):
+    for number, row in read_rows(input_path):
+        try:
+            yield normalize_row(row)
+        except Exception as e:
+            skipped.append((number, f"{type(e).__name__}: {e}"))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge registrants into one roster PDF.")
+    parser.add_argument("input", help="registrants .csv or .jsonl")
+    parser.add_argument("-o", "--output", default="roster.pdf")
+    parser.add_argument("--template", default=pdf_fill.TEMPLATE_PATH)
+    args = parser.parse_args(argv)
+
+    skipped = []
+    start = time.perf_counter()
+    with open(args.output, "wb") as f:
+        count = export_roster(_valid_rows(args.input, skipped), f, args.template)
+        size = f.tell()
+    for number, error in skipped:
+        print(f"⚠️ row {number}: {error}", file=sys.stderr)
+    print(f"✅ {count} registrants, {size:,} bytes in {time.perf_counter() - start:.2f}s -> {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+# ---------------------------------------
+# 🧠 PER-SESSION MEMORY ACCOUNTING + IDLE EVICTION
+# ---------------------------------------
+# Every session keeps its chat history, rendered-history cache and form
+# widget values in st.session_state for as long as the tab stays connected,
+# and an abandoned Messenger tab can stay connected for days. touch() runs at
+# the start of every script / fragment run and refreshes the session's
+# SessionRecord; a background sweeper (every SESSION_SWEEP_INTERVAL seconds):
+#   - sizes each session's state (bytes it owns: catalog HTML and response
+#     ids are shared process-wide and not counted, like
+#     bench/bench_session_memory.py's "owned")
+#   - evicts sessions idle for SESSION_IDLE_TTL seconds: the history is cut
+#     to its last SESSION_KEEP_MESSAGES messages, the rendered-history cache
+#     is dropped and finished PDFs nobody collected are released. A compact
+#     summary (st.session_state.session_summary) is kept and shown above the
+#     history when the user comes back.
+#   - exports totals (app_sessions, app_session_state_bytes, ...) via metrics
+# The history itself is capped per session by chat_ui.HISTORY_MAX.
+#
+# The sweeper only mutates objects the session owns in place (the messages
+# list, the history cache dict) and never touches st.session_state from
+# another thread. It holds _lock while evicting, and touch() takes the same
+# lock, so a session that comes back waits for an eviction in progress
+# instead of racing it. The registry holds SessionRecords weakly: once
+# Streamlit drops a session, its record (and entry) goes with it.
+
+import logging
+import os
+import sys
+import threading
+import time
+import uuid
+import weakref
+
+import streamlit as st
+
+import chatbot
+import metrics
+import pdf_jobs
+
+log = logging.getLogger(__name__)
+
+IDLE_TTL = float(os.environ.get("SESSION_IDLE_TTL", "1800"))
+KEEP_MESSAGES = int(os.environ.get("SESSION_KEEP_MESSAGES", "6"))
+SWEEP_INTERVAL = float(os.environ.get("SESSION_SWEEP_INTERVAL", "60"))
+
+STATE_KEY = "session_record"
+SUMMARY_KEY = "session_summary"
+# ✅ Handed from one run to the next and popped there (app.py pdf_result holds the
+#    PDF bytes): a snapshot would keep them alive after the session dropped them
+TRANSIENT_KEYS = (STATE_KEY, "pdf_result")
+
+_lock = threading.Lock()
+_sessions = weakref.WeakValueDictionary()  # session key -> SessionRecord
+_evictions = 0
+_evicted_bytes = 0
+_sweeper_started = False
+_shared = None  # ((chatbot.matcher, record count) it was built for, ids of shared objects)
+
+
+class SessionRecord:
+    """What the sweeper knows about one session (kept in its own session state)."""
+
+    __slots__ = ("key", "last_seen", "values", "bytes", "measured", "evicted", "__weakref__")
+
+    def __init__(self, key):
+        self.key = key
+        self.last_seen = time.monotonic()
+        self.values = {}    # snapshot of the session's state, refreshed by touch()
+        self.bytes = 0      # owned bytes at the last sweep
+        self.measured = None  # last_seen when bytes was measured (unchanged since -> skip)
+        self.evicted = None  # last eviction, until touch() folds it into SUMMARY_KEY
+
+
+# ---------------------------------------
+# Sizing
+# ---------------------------------------
+def _shared_ids():
+    # ✅ Objects every session points at: response ids, catalog HTML, roles, bot records.
+    #    A catalog reload (chatbot.set_catalog) brings new HTML and a first reply
+    #    with some id a new record, so rebuild then.
+    global _shared
+    version = (chatbot.matcher, len(chatbot.bot_records))  # matcher: replaced by every set_catalog()
+    if _shared is None or _shared[0] != version:
+        shared = {id("You"), id("Bot")}
+        for response_id in list(chatbot.response_table):
+            shared.update((id(response_id), id(chatbot.response_html(response_id))))
+        shared.update(id(record) for record in list(chatbot.bot_records.values()))
+        _shared = (version, shared)
+    return _shared[1]
+
+
+def deep_size(obj, shared=frozenset(), seen=None):
+    """Approximate bytes reachable from obj, skipping shared objects."""
+    seen = set() if seen is None else seen
+    stack = [obj]
+    size = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or id(obj) in shared:
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+    return size
+
+
+def _measure(record):
+    # ✅ Another thread may be appending to this session's state; retry next sweep
+    try:
+        size = deep_size(record.values, _shared_ids())
+    except RuntimeError:
+        return record.bytes
+    return size + pdf_jobs.session_bytes(record.values.get("session_key"))
+
+
+# ---------------------------------------
+# Per-run hook
+# ---------------------------------------
+def touch():
+    """Mark this session active (call at the start of every script and fragment run)."""
+    record = st.session_state.get(STATE_KEY)
+    with _lock:
+        if record is None:
+            if "session_key" not in st.session_state:
+                # ✅ Unique per session; id(st.session_state) is the same proxy object for everyone
+                st.session_state.session_key = uuid.uuid4().hex
+            record = SessionRecord(st.session_state.session_key)
+            _sessions[record.key] = record
+            st.session_state[STATE_KEY] = record
+        record.last_seen = time.monotonic()
+        summary, record.evicted = record.evicted, None
+    if summary is not None:
+        # ✅ Keep chat_ui's absolute message positions right after the cut
+        st.session_state.history_trimmed = st.session_state.get("history_trimmed", 0) + summary["messages_dropped"]
+        previous = st.session_state.get(SUMMARY_KEY) or {"messages_dropped": 0, "evictions": 0}
+        st.session_state[SUMMARY_KEY] = {
+            "messages_dropped": previous["messages_dropped"] + summary["messages_dropped"],
+            "evictions": previous["evictions"] + 1,
+            "idle_seconds": summary["idle_seconds"],
+        }
+    values = st.session_state.to_dict()
+    for key in TRANSIENT_KEYS:
+        values.pop(key, None)  # ✅ also no record -> values -> record cycle
+    record.values = values
+
+
+# ---------------------------------------
+# Sweeper
+# ---------------------------------------
+def _evict(record, now):
+    values = record.values
+    messages = values.get("messages")
+    dropped = 0
+    if isinstance(messages, list) and len(messages) > KEEP_MESSAGES:
+        dropped = len(messages) - KEEP_MESSAGES
+        del messages[:dropped]
+    cache = values.get("history_html")
+    if isinstance(cache, dict):
+        cache.clear()
+    pdf_jobs.forget_session(values.get("session_key"))
+    before = record.bytes
+    record.bytes, record.measured = _measure(record), record.last_seen
+    record.evicted = {
+        "messages_dropped": dropped,
+        "messages_kept": len(messages) if isinstance(messages, list) else 0,
+        "idle_seconds": round(now - record.last_seen),
+        "bytes_freed": max(0, before - record.bytes),
+    }
+    return record.evicted
+
+
+def sweep(now=None):
+    """Size every session and evict the idle ones; returns stats()."""
+    global _evictions, _evicted_bytes
+    now = time.monotonic() if now is None else now
+    with _lock:
+        records = list(_sessions.values())
+    for record in records:
+        seen = record.last_seen
+        if record.measured != seen:
+            record.bytes = _measure(record)
+            record.measured = seen
+    for record in records:
+        with _lock:
+            # ✅ Evicted once per idle spell; touch() clears the summary when the user is back
+            if record.evicted is not None or now - record.last_seen < IDLE_TTL:
+                continue
+            summary = _evict(record, now)
+            if summary["messages_dropped"] or summary["bytes_freed"]:
+                _evictions += 1
+                _evicted_bytes += summary["bytes_freed"]
+            else:
+                record.evicted = None  # nothing to free; don't bother the user
+    return stats(now)
+
+
+def start_sweeper():
+    """Start the background sweeper thread (once per process)."""
+    global _sweeper_started
+    with _lock:
+        if _sweeper_started or SWEEP_INTERVAL <= 0:
+            return
+        _sweeper_started = True
+
+    def loop():
+        while True:
+            time.sleep(SWEEP_INTERVAL)
+            try:
+                sweep()
+            except Exception as e:
+                log.error("session sweep failed: %s", e)
+
+    threading.Thread(target=loop, name="session-sweeper", daemon=True).start()
+
+
+# ---------------------------------------
+# Stats
+# ---------------------------------------
+def stats(now=None):
+    now = time.monotonic() if now is None else now
+    with _lock:
+        records = list(_sessions.values())
+        evictions, evicted_bytes = _evictions, _evicted_bytes
+    sizes = sorted(r.bytes for r in records)
+    idle = sum(1 for r in records if now - r.last_seen >= IDLE_TTL)
+    return {
+        "sessions": len(records),
+        "active": len(records) - idle,
+        "idle": idle,
+        "bytes": sum(sizes),
+        "max_bytes": sizes[-1] if sizes else 0,
+        "p95_bytes": sizes[min(len(sizes) - 1, int(len(sizes) * 0.95))] if sizes else 0,
+        "evictions": evictions,
+        "evicted_bytes": evicted_bytes,
+    }
+
+
+def _session_metrics():
+    s = stats()
+    return [
+        ("app_sessions", "gauge", "Tracked sessions, by activity.",
+         {(("state", "active"),): s["active"], (("state", "idle"),): s["idle"]}),
+        ("app_session_state_bytes", "gauge", "Approximate session-state bytes owned by sessions (at the last sweep).",
+         {(("stat", "total"),): s["bytes"], (("stat", "max"),): s["max_bytes"], (("stat", "p95"),): s["p95_bytes"]}),
+        ("app_session_evictions_total", "counter", "Idle sessions whose heavy state was evicted.", {(): s["evictions"]}),
+        ("app_session_evicted_bytes_total", "counter", "Bytes freed by idle-session eviction.", {(): s["evicted_bytes"]}),
+    ]
+
+
+metrics.register_collector(_session_metrics)